@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from models import db, ArchivedSale, Sale
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def default_cutoff(days=DEFAULT_ARCHIVE_AFTER_DAYS):
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def archive_sales(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move sales older than `cutoff` from `sale` to `sale_archive`; returns the number moved.
+
+    Each batch is copied and deleted in its own transaction, so the write
+    lock is only held briefly and an interrupted run can simply be repeated.
+    Rows keep their ids. Rollups and running totals are untouched: the sales
+    still exist, and the rebuild functions read both tables.
+    """
+    # SQLite hands out max(id) + 1 for new rows, so the newest sale always stays
+    # behind; otherwise emptying `sale` would let new ids collide with archived ones.
+    newest_id = db.session.query(func.max(Sale.id)).scalar()
+    if newest_id is None:
+        return 0
+
+    columns = [column.name for column in Sale.__table__.c]
+    moved = 0
+    while True:
+        ids = [
+            row.id for row in db.session.query(Sale.id)
+            .filter(Sale.timestamp < cutoff, Sale.id < newest_id)
+            .order_by(Sale.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+
+        batch = Sale.__table__.c.id.in_(ids)
+        db.session.execute(insert(ArchivedSale).from_select(
+            columns, select(*[Sale.__table__.c[name] for name in columns]).where(batch),
+        ))
+        db.session.execute(delete(Sale).where(batch))
+        db.session.commit()
+        moved += len(ids)
+    return moved
@@ -0,0 +1,95 @@
+"""Fire many concurrent sales at a single product and check it is never oversold.
+
+Usage: python bench/concurrent_sales.py [--threads 32] [--sales 2000] [--stock 1500]
+
+Runs against a throwaway SQLite database passed to create_app(), so it is
+safe to run from a working checkout. Exits non-zero on any oversell.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--sales', type=int, default=2000, help='total sale attempts')
+    parser.add_argument('--stock', type=int, default=1500, help='starting stock of the product')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='inventory-bench-')
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from migrations import upgrade_db
+    from models import db, Product, Sale, User
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+    })
+    with app.app_context():
+        upgrade_db()
+        db.session.add(User(username='bench', full_name='Bench', email='bench@example.com',
+                            password=generate_password_hash('bench'), role='admin', is_approved=True))
+        product = Product(name='Contended item', quantity=args.stock, price=10, cost_price=6)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            local.client.post('/login', data={'username': 'bench', 'password': 'bench'})
+        return local.client
+
+    def sell(_):
+        started = time.perf_counter()
+        response = client().post('/sale', data={
+            'product_id': product_id, 'quantity': 1, 'cost_price': 6, 'unit_price': 10,
+        })
+        return response.status_code, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        # Log every worker in before the clock starts
+        list(pool.map(lambda _: client(), range(args.threads * 4)))
+        started = time.perf_counter()
+        results = list(pool.map(sell, range(args.sales)))
+        elapsed = time.perf_counter() - started
+
+    sold = sum(1 for status, _ in results if status == 302)
+    rejected = sum(1 for status, _ in results if status == 400)
+    errors = len(results) - sold - rejected
+    latencies = sorted(latency for _, latency in results)
+
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).quantity
+        recorded = Sale.query.filter_by(product_id=product_id).count()
+
+    print(f"attempts={args.sales} threads={args.threads} stock={args.stock}")
+    print(f"sold={sold} rejected={rejected} errors={errors} remaining={remaining} sale_rows={recorded}")
+    print(f"throughput={len(results) / elapsed:.1f} req/s "
+          f"p50={latencies[len(latencies) // 2] * 1000:.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+
+    ok = (
+        remaining >= 0
+        and remaining == args.stock - sold
+        and recorded == sold
+        and sold == min(args.stock, args.sales)
+        and errors == 0
+    )
+    print("OK" if ok else "FAILED: stock was oversold or sales were lost")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
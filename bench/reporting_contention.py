@@ -0,0 +1,130 @@
+"""Checkout latency while large exports run, with and without the reporting pool.
+
+Usage: python bench/reporting_contention.py [--sales 100000] [--exporters 4] [--sellers 4]
+                                            [--duration 10] [--pool-size 5]
+
+A seeded database (bench/seed.py, cached under --cache-dir) is copied and
+POST /sale is timed from --sellers threads in three runs: alone, while
+--exporters threads stream full exports through the main engine
+(REPORTING_DATABASE_URI=''), and while they stream them through the
+read-only reporting pool. --pool-size caps the main engine's pool so the
+shared run shows what happens once exports hold most of its connections.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from routes import percentile, sale_form, scale_database  # noqa: E402
+from seed import BENCH_PASSWORD, database_url  # noqa: E402
+
+EXPORT_URLS = ['/export/sales?format=csv', '/export', '/export/pnl']
+
+# (label, extra config, whether exports run)
+MODES = [
+    ('checkout only', {}, False),
+    ('shared pool', {'REPORTING_DATABASE_URI': ''}, True),
+    ('reporting pool', {}, True),
+]
+
+
+def run_mode(path, config, with_exports, args):
+    from app import create_app
+    from models import db, Product
+
+    workdir = tempfile.mkdtemp(prefix='inventory-contention-')
+    copy = os.path.join(workdir, 'bench.db')
+    with sqlite3.connect(path) as src, sqlite3.connect(copy) as dst:
+        src.backup(dst)
+
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url(copy),
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': args.pool_size, 'max_overflow': 0, 'pool_timeout': 120},
+        'SLOW_QUERY_MS': 60000,
+        **config,
+    })
+    with app.app_context():
+        product_id = db.session.query(Product.id).order_by(Product.id).first().id
+
+    def logged_in_client():
+        client = app.test_client()
+        response = client.post('/login', data={'username': 'bench-admin', 'password': BENCH_PASSWORD})
+        assert response.status_code == 302, 'could not log in as the seeded admin'
+        return client
+
+    stop = threading.Event()
+    sale_timings, export_timings, errors = [], [], []
+    lock = threading.Lock()
+
+    def seller():
+        client = logged_in_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/sale', data=sale_form(product_id))
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                (sale_timings if response.status_code == 302 else errors).append(elapsed)
+
+    def exporter(offset):
+        client = logged_in_client()
+        turn = offset
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.get(EXPORT_URLS[turn % len(EXPORT_URLS)])
+            response.get_data()  # drains streamed exports
+            response.close()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                (export_timings if response.status_code == 200 else errors).append(elapsed)
+            turn += 1
+
+    threads = [threading.Thread(target=seller) for _ in range(args.sellers)]
+    if with_exports:
+        threads += [threading.Thread(target=exporter, args=(i,)) for i in range(args.exporters)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return sale_timings, export_timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=100000, help='seeded sales (database scale)')
+    parser.add_argument('--exporters', type=int, default=4, help='threads streaming exports')
+    parser.add_argument('--sellers', type=int, default=4, help='threads posting sales')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--pool-size', type=int, default=5, help='main engine pool size')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'inventory-bench-data'))
+    args = parser.parse_args()
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    path = scale_database(args.cache_dir, args.sales)
+    print(f"sales={args.sales} sellers={args.sellers} exporters={args.exporters} "
+          f"pool_size={args.pool_size} duration={args.duration}s")
+
+    for label, config, with_exports in MODES:
+        sales, exports, errors = run_mode(path, config, with_exports, args)
+        line = (f"  {label:<15} sales={len(sales):>5} ({len(sales) / args.duration:6.1f}/s) "
+                f"p50={percentile(sales, 50):7.1f}ms p95={percentile(sales, 95):7.1f}ms "
+                f"max={max(sales):7.1f}ms")
+        if exports:
+            line += f" exports={len(exports)} export_p50={percentile(exports, 50):7.1f}ms"
+        if errors:
+            line += f" errors={len(errors)}"
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
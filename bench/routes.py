@@ -0,0 +1,180 @@
+"""Route-level benchmark: latency percentiles and peak memory at several data scales.
+
+Usage: python bench/routes.py [--scales 10000,100000] [--repeat 20]
+                              [--output bench/results] [--compare OLD.json]
+
+For each scale (number of sales) a database is seeded with bench/seed.py and
+cached under --cache-dir, then every route in ROUTES is requested through the
+Flask test client as the seeded admin. Streamed bodies are read to the end so
+exports are timed in full. Peak Python memory per route comes from a separate
+tracemalloc pass, so it does not skew the timings.
+
+Results are written as JSON (one file per run, named after the commit) so a
+later run can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seed import BENCH_PASSWORD, database_url, seed_database  # noqa: E402
+
+# (name, method, url, repeat divisor); full-table reports run fewer times
+ROUTES = [
+    ('dashboard', 'GET', '/dashboard', 1),
+    ('sales', 'GET', '/sales', 1),
+    ('products', 'GET', '/products', 1),
+    ('export', 'GET', '/export', 5),
+    ('export_sales', 'GET', '/export/sales?format=xlsx', 5),
+    ('export_sales_csv', 'GET', '/export/sales?format=csv', 5),
+    ('sale', 'POST', '/sale', 1),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def scale_database(cache_dir, sales):
+    """Seeded database for `sales` rows, reused across runs if already built."""
+    path = os.path.join(cache_dir, f'bench-{sales}.db')
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        seed_database(path + '.tmp', sales=sales, products=max(100, min(sales // 100, 10000)),
+                      expenses=max(100, sales // 50), users=20, days=730)
+        os.replace(path + '.tmp', path)
+        print(f"  seeded {sales} sales in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def sale_form(product_id):
+    return {'product_id': product_id, 'quantity': 1, 'unit_price': 1, 'customer_name': 'Bench'}
+
+
+def bench_scale(path, repeat):
+    from app import create_app
+    from models import db, Product
+
+    # Work on a copy so POST /sale does not grow the cached database between runs
+    workdir = tempfile.mkdtemp(prefix='inventory-routes-')
+    copy = os.path.join(workdir, 'bench.db')
+    with sqlite3.connect(path) as src, sqlite3.connect(copy) as dst:
+        src.backup(dst)
+
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url(copy), 'SLOW_QUERY_MS': 60000})
+    with app.app_context():
+        product_id = db.session.query(Product.id).order_by(Product.id).first().id
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'bench-admin', 'password': BENCH_PASSWORD})
+    assert response.status_code == 302, 'could not log in as the seeded admin'
+
+    def request(method, url):
+        if method == 'POST':
+            response = client.post(url, data=sale_form(product_id))
+        else:
+            response = client.get(url)
+        body = response.get_data()  # drains streamed exports
+        response.close()
+        return response.status_code, len(body)
+
+    results = {}
+    for name, method, url, divisor in ROUTES:
+        request(method, url)  # warm-up: templates, statement cache
+        timings = []
+        for _ in range(max(1, repeat // divisor)):
+            started = time.perf_counter()
+            status, size = request(method, url)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        request(method, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            'method': method,
+            'url': url,
+            'status': status,
+            'bytes': size,
+            'runs': len(timings),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+            'peak_mem_kb': round(peak / 1024, 1),
+        }
+        print(f"  {name:<18} p50={results[name]['p50_ms']:>9.1f}ms p95={results[name]['p95_ms']:>9.1f}ms "
+              f"peak={results[name]['peak_mem_kb']:>10.1f}KB status={status}")
+    return results
+
+
+def compare(previous, current):
+    """Print p50 and peak memory changes for every (scale, route) present in both runs."""
+    print(f"\nvs {previous.get('commit')} ({previous.get('created_at')})")
+    for scale, routes in current['scales'].items():
+        old_routes = previous.get('scales', {}).get(scale, {})
+        for name, now in routes.items():
+            old = old_routes.get(name)
+            if not old:
+                continue
+            change = (now['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            print(f"  {scale:>8} {name:<18} p50 {old['p50_ms']:>9.1f} -> {now['p50_ms']:>9.1f}ms ({change:+.0f}%) "
+                  f"peak {old['peak_mem_kb']:>10.1f} -> {now['peak_mem_kb']:>10.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='10000,100000', help='comma-separated sale counts')
+    parser.add_argument('--repeat', type=int, default=20, help='requests per route (fewer for full reports)')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'inventory-bench-data'))
+    parser.add_argument('--output', default=os.path.join(ROOT, 'bench', 'results'))
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    run = {
+        'commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'scales': {},
+    }
+    for sales in (int(s) for s in args.scales.split(',')):
+        print(f"scale: {sales} sales")
+        run['scales'][str(sales)] = bench_scale(scale_database(args.cache_dir, sales), args.repeat)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"routes-{run['commit']}-{run['created_at'].replace(':', '')}.json")
+    with open(path, 'w') as output:
+        json.dump(run, output, indent=2)
+    print(f"\nresults written to {path}")
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), run)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
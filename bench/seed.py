@@ -0,0 +1,181 @@
+"""Fill a database with realistic volumes of users, products, sales and expenses.
+
+Usage: python bench/seed.py DATABASE [--sales 1000000] [--products 5000]
+                           [--expenses 20000] [--users 50] [--days 730] [--seed 1]
+
+DATABASE should be new or empty: an SQLite file path (created if missing)
+or a full SQLAlchemy URL. Product popularity follows a Zipf-like curve, so
+a few products account for most sales, as in a real shop. Rows are written with
+Core executemany in batches; the running totals and daily rollups are
+rebuilt and the stock is snapshotted at the end so the reports match the
+data. Every seeded user has the password "bench"; the first one,
+"bench-admin", is an admin.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_BATCH_SIZE = 20000
+BENCH_PASSWORD = 'bench'
+PAYMENT_TYPES = ('Cash', 'Card', 'Mobile Money', 'Transfer')
+PAYMENT_WEIGHTS = (50, 25, 20, 5)
+CATEGORIES = ('Rice', 'Beans', 'Soap', 'Oil', 'Sugar', 'Milk', 'Tea', 'Flour', 'Salt', 'Biscuits',
+              'Juice', 'Water', 'Noodles', 'Tomato Paste', 'Detergent', 'Batteries', 'Candles')
+SIZES = ('Small', 'Medium', 'Large', '500g', '1kg', '5kg', '1L', '5L', 'Pack of 6', 'Carton')
+EXPENSE_KINDS = ('Rent', 'Electricity', 'Fuel', 'Transport', 'Salaries', 'Repairs', 'Packaging', 'Internet')
+
+
+def database_url(database):
+    return database if '://' in database else f"sqlite:///{os.path.abspath(database)}"
+
+
+def _batches(rows, size=SEED_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def popularity_weights(count, skew=1.1):
+    """Zipf-like weights: the product at rank r is sold ~1/r**skew as often as the top one."""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def seed(sales=100000, products=2000, expenses=5000, users=20, days=365, rng_seed=1):
+    """Insert the requested volumes into the current app's database; returns row counts."""
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+
+    from models import db, Expense, Product, Sale, User
+    from rollups import backfill_rollups
+    from stock_ledger import take_snapshot
+    from totals import reconcile_totals
+
+    rng = random.Random(rng_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    window = days * 86400
+
+    # One hash for everyone: hashing per user would dominate small seeds
+    password = generate_password_hash(BENCH_PASSWORD)
+    user_rows = [{
+        'username': 'bench-admin' if i == 0 else f'bench-user-{i}',
+        'full_name': f'Bench User {i}',
+        'email': f'bench{i}@example.com',
+        'password': password,
+        'role': 'admin' if i == 0 else rng.choice(('user', 'user', 'approver')),
+        'is_approved': True,
+    } for i in range(users)]
+    db.session.execute(insert(User.__table__), user_rows)
+
+    product_rows = []
+    for i in range(products):
+        cost = round(rng.lognormvariate(1.5, 0.8), 2)
+        product_rows.append({
+            'name': f'{rng.choice(CATEGORIES)} {rng.choice(SIZES)} #{i + 1}',
+            'quantity': rng.randint(10 ** 6, 2 * 10 ** 6),  # enough that benchmarked sales never run out
+            'cost_price': cost,
+            'price': round(cost * rng.uniform(1.1, 1.6), 2),
+        })
+    for batch in _batches(product_rows):
+        db.session.execute(insert(Product.__table__), batch)
+
+    catalogue = db.session.query(Product.id, Product.price, Product.cost_price).order_by(Product.id).all()
+    user_ids = [row.id for row in db.session.query(User.id)]
+    weights = popularity_weights(len(catalogue))
+    # Shuffle so popularity is not correlated with insertion order
+    ranked = catalogue[:]
+    rng.shuffle(ranked)
+
+    def sale_rows():
+        remaining = sales
+        while remaining:
+            size = min(SEED_BATCH_SIZE, remaining)
+            remaining -= size
+            picks = rng.choices(ranked, weights=weights, k=size)
+            payments = rng.choices(PAYMENT_TYPES, weights=PAYMENT_WEIGHTS, k=size)
+            for product, payment in zip(picks, payments):
+                quantity = rng.choice((1, 1, 1, 2, 2, 3, 5, 10))
+                unit_price = product.price
+                yield {
+                    'product_id': product.id,
+                    'quantity': quantity,
+                    'cost_price': product.cost_price,
+                    'unit_price': unit_price,
+                    'total_price': unit_price * quantity,
+                    'timestamp': now - timedelta(seconds=rng.randrange(window)),
+                    'customer_name': f'Customer {rng.randrange(5000)}',
+                    'payment_type': payment,
+                    'comments': None,
+                    'user_id': rng.choice(user_ids),
+                    'order_ref': None,
+                }
+
+    for batch in _batches(sale_rows()):
+        db.session.execute(insert(Sale.__table__), batch)
+
+    expense_rows = ({
+        'description': rng.choice(EXPENSE_KINDS),
+        'amount': round(rng.lognormvariate(3.5, 1.0), 2),
+        'timestamp': now - timedelta(seconds=rng.randrange(window)),
+    } for _ in range(expenses))
+    for batch in _batches(expense_rows):
+        db.session.execute(insert(Expense.__table__), batch)
+
+    db.session.commit()
+    backfill_rollups()
+    reconcile_totals()
+    # Seeded stock bypasses the movement ledger; snapshot it as the baseline
+    take_snapshot()
+    return {'users': users, 'products': products, 'sales': sales, 'expenses': expenses}
+
+
+def seed_database(database, **volumes):
+    """Create/upgrade the schema at `database` and seed it; returns row counts."""
+    from app import create_app
+    from migrations import upgrade_db
+    from models import db
+
+    # Bulk batches are slow by design; keep them out of the slow-query log
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url(database), 'SLOW_QUERY_MS': 60000})
+    with app.app_context():
+        upgrade_db()
+        counts = seed(**volumes)
+        # Closing the pool lets SQLite fold the WAL back into the main file
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database', help='SQLite file path or SQLAlchemy URL')
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--expenses', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--days', type=int, default=365, help='spread sales and expenses over this many days')
+    parser.add_argument('--seed', type=int, default=1, help='random seed, for repeatable data')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed_database(
+        args.database, sales=args.sales, products=args.products, expenses=args.expenses,
+        users=args.users, days=args.days, rng_seed=args.seed,
+    )
+    elapsed = time.perf_counter() - started
+    print(', '.join(f"{name}={count}" for name, count in counts.items()) + f" in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Measure cold start (import + app creation), first-request and first-dashboard latency.
+
+Usage: python bench/startup.py [--runs 10] [--path CHECKOUT]
+
+Each run is a fresh interpreter, so module imports are never warm. `--path`
+points at another checkout (e.g. a `git worktree` of an older commit) to
+compare against; both the `create_app()` factory and a module-level `app`
+are supported. Every run uses its own throwaway SQLite database. After
+/login, an admin logs in and opens /dashboard, the page every user lands
+on, which must not pull in pandas either.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line of timings in ms
+PROBE = r'''
+import json, os, sys, time
+started = time.perf_counter()
+import app as app_module
+if hasattr(app_module, 'create_app'):
+    app = app_module.create_app({'TESTING': True})
+else:
+    app = app_module.app
+    app.config['TESTING'] = True
+ready = time.perf_counter()
+
+from werkzeug.security import generate_password_hash
+from migrations import upgrade_db
+from models import db, User
+with app.app_context():
+    upgrade_db()
+    db.session.add(User(username='startup', full_name='Startup', email='startup@example.com',
+                        password=generate_password_hash('startup'), role='admin', is_approved=True))
+    db.session.commit()
+
+client = app.test_client()
+request_started = time.perf_counter()
+response = client.get('/login')
+finished = time.perf_counter()
+assert response.status_code == 200, response.status_code
+pandas_at_startup = 'pandas' in sys.modules
+
+client.post('/login', data={'username': 'startup', 'password': 'startup'})
+dashboard_started = time.perf_counter()
+response = client.get('/dashboard')
+dashboard_finished = time.perf_counter()
+assert response.status_code == 200, response.status_code
+
+print(json.dumps({
+    'startup_ms': (ready - started) * 1000,
+    'first_request_ms': (finished - request_started) * 1000,
+    'dashboard_ms': (dashboard_finished - dashboard_started) * 1000,
+    'pandas_loaded': pandas_at_startup,
+    'pandas_after_dashboard': 'pandas' in sys.modules,
+}))
+'''
+
+
+def run_once(path):
+    workdir = tempfile.mkdtemp(prefix='inventory-startup-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    env['PYTHONPATH'] = path
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=workdir, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default=ROOT, help='checkout to measure (default: this one)')
+    args = parser.parse_args()
+
+    samples = [run_once(os.path.abspath(args.path)) for _ in range(args.runs)]
+    startup = [s['startup_ms'] for s in samples]
+    first = [s['first_request_ms'] for s in samples]
+    dashboard = [s['dashboard_ms'] for s in samples]
+
+    print(f"checkout={os.path.abspath(args.path)} runs={args.runs}")
+    print(f"startup        median={statistics.median(startup):.1f}ms min={min(startup):.1f}ms")
+    print(f"first request  median={statistics.median(first):.1f}ms min={min(first):.1f}ms")
+    print(f"first dashboard median={statistics.median(dashboard):.1f}ms min={min(dashboard):.1f}ms")
+    print(f"pandas imported at startup: {samples[0]['pandas_loaded']}, "
+          f"after the dashboard: {samples[0]['pandas_after_dashboard']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,8 @@
+from blueprints import admin, api, auth, expenses, products, reports, sales
+
+BLUEPRINTS = (auth.bp, admin.bp, products.bp, sales.bp, expenses.bp, reports.bp, api.bp)
+
+
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
@@ -0,0 +1,92 @@
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required
+
+from blueprints.helpers import admin_required, approver_required
+from live_updates import get_broker
+from metrics import get_registry
+from models import db, User
+from page_cache import page_cache
+from user_cache import user_cache
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/admin/pending_users')
+@login_required
+@approver_required
+def pending_users():
+    users = User.query.filter_by(is_approved=False).all()
+    return render_template('pending_users.html', users=users)
+
+@bp.route('/admin/approve_user/<int:user_id>', methods=['POST'])
+@login_required
+@approver_required
+def approve_user(user_id):
+    user = User.query.get_or_404(user_id)
+    user.is_approved = True
+    db.session.commit()
+    user_cache.invalidate(user.id)
+    flash(f"User {user.username} approved.", "success")
+    return redirect(url_for('admin.pending_users'))
+
+@bp.route('/admin/reject_user/<int:user_id>', methods=['POST'])
+@login_required
+@approver_required
+def reject_user(user_id):
+    user = User.query.get_or_404(user_id)
+    db.session.delete(user)
+    db.session.commit()
+    user_cache.invalidate(user_id)
+    flash(f"User {user.username} rejected and deleted.", "info")
+    return redirect(url_for('admin.pending_users'))
+
+@bp.route('/admin/users')
+@login_required
+@admin_required
+def manage_users():
+    users = User.query.all()
+    return render_template('admin_manage_users.html', users=users)
+
+@bp.route('/admin/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify({'user_cache': user_cache.stats(), 'page_cache': page_cache.stats()})
+
+@bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    cache = user_cache.stats()
+    pages = page_cache.stats()
+    live = get_broker().stats()
+    body = get_registry().render(extra=[
+        ('inventory_user_cache_hits_total', 'counter', 'User cache hits.', cache['hits']),
+        ('inventory_user_cache_misses_total', 'counter', 'User cache misses.', cache['misses']),
+        ('inventory_user_cache_size', 'gauge', 'Users currently cached.', cache['size']),
+        ('inventory_page_cache_hits_total', 'counter', 'Pages served from the page cache.', pages['hits']),
+        ('inventory_page_cache_misses_total', 'counter', 'Pages rendered and cached.', pages['misses']),
+        ('inventory_page_not_modified_total', 'counter', 'Conditional GETs answered with 304.', pages['not_modified']),
+        ('inventory_live_subscribers', 'gauge', 'Dashboards connected to the live stream.', live['subscribers']),
+        ('inventory_live_events_total', 'counter', 'Live dashboard events published.', live['published']),
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@bp.route('/admin/users/edit/<int:user_id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def edit_user(user_id):
+    user = User.query.get_or_404(user_id)
+    if request.method == 'POST':
+        # Extract role and approval status from form
+        new_role = request.form.get('role')
+        is_approved = True if request.form.get('is_approved') == 'on' else False
+
+        user.role = new_role
+        user.is_approved = is_approved
+        db.session.commit()
+        user_cache.invalidate(user.id)
+        flash(f"Updated user {user.username} successfully.", "success")
+        return redirect(url_for('admin.manage_users'))
+    
+    return render_template('admin_edit_user.html', user=user)
@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import login_required
+
+from models import db, Product, Sale, User
+from queries import get_page_size, keyset_page
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_BATCH_IDS = 500
+# How far server_time is set back: a write is stamped when its statement runs
+# but only visible once it commits, which can be later by a busy_timeout wait
+DEFAULT_SYNC_OVERLAP_SECONDS = 60
+
+PRODUCT_FIELDS = {
+    'id': Product.id,
+    'name': Product.name,
+    'quantity': Product.quantity,
+    'price': Product.price,
+    'cost_price': Product.cost_price,
+    'updated_at': Product.updated_at,
+}
+
+SALE_FIELDS = {
+    'id': Sale.id,
+    'order_ref': Sale.order_ref,
+    'product_id': Sale.product_id,
+    'product_name': Product.name,
+    'quantity': Sale.quantity,
+    'cost_price': Sale.cost_price,
+    'unit_price': Sale.unit_price,
+    'total_price': Sale.total_price,
+    'customer_name': Sale.customer_name,
+    'payment_type': Sale.payment_type,
+    'comments': Sale.comments,
+    'user_id': Sale.user_id,
+    'username': User.username,
+    'timestamp': Sale.timestamp,
+}
+
+# Sale fields that live on another table; the join is only added when one is requested
+SALE_JOINS = {
+    'product_name': (Product, Sale.product_id == Product.id),
+    'username': (User, Sale.user_id == User.id),
+}
+
+
+def _bad_request(message):
+    return jsonify({'error': str(message)}), 400
+
+
+def _parse_fields(available, default):
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _parse_ids():
+    raw = request.args.get('ids')
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(i) for i in raw.split(',') if i.strip()))
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of integers") from None
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids per request")
+    return ids
+
+
+def _parse_since():
+    raw = request.args.get('since')
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError("since must be an ISO 8601 timestamp, e.g. the server_time of the previous sync") from None
+
+
+def _serialise(row, fields):
+    item = {}
+    for name in fields:
+        value = getattr(row, name)
+        item[name] = value.isoformat() if isinstance(value, datetime) else value
+    return item
+
+
+def _collection(model, fields_map, default_fields, change_column, joins=None):
+    """Column-only listing shared by every resource.
+
+    `?ids=` returns just those rows (plus the ids not found) in one query.
+    Otherwise rows are keyset-paginated by id, or, with `?since=`, by
+    (`change_column`, id) from that point on, so a client can resume a sync
+    from the `server_time` of its previous one. Deleted rows are not
+    reported; a client that needs them re-reads the full listing.
+
+    `server_time` is set back by API_SYNC_OVERLAP_SECONDS so a change
+    stamped before the request but committed after it is still picked up
+    next time. Rows changed in that overlap are returned again: clients
+    must upsert by id rather than append.
+    """
+    overlap = current_app.config.get('API_SYNC_OVERLAP_SECONDS', DEFAULT_SYNC_OVERLAP_SECONDS)
+    server_time = datetime.utcnow() - timedelta(seconds=overlap)
+    try:
+        fields = _parse_fields(fields_map, default_fields)
+        ids = _parse_ids()
+        since = _parse_since()
+    except ValueError as exc:
+        return _bad_request(exc)
+
+    id_column = fields_map['id']
+    keys = [change_column, id_column] if since else [id_column]
+    # Cursor keys have to come back in each row even when not asked for
+    selected = fields + [k.key for k in keys if k.key not in fields]
+
+    query = db.session.query(*[fields_map[name].label(name) for name in selected]).select_from(model)
+    for name, (joined, onclause) in (joins or {}).items():
+        if name in selected:
+            query = query.outerjoin(joined, onclause)
+
+    if ids is not None:
+        rows = query.filter(id_column.in_(ids)).order_by(id_column).all() if ids else []
+        found = {row.id for row in rows}
+        return jsonify({
+            'items': [_serialise(row, fields) for row in rows],
+            'missing': [i for i in ids if i not in found],
+        })
+
+    if since:
+        query = query.filter(change_column >= since)
+    try:
+        page = keyset_page(query, keys, after=request.args.get('cursor'),
+                           page_size=get_page_size(request.args.get('per_page')))
+    except ValueError as exc:
+        return _bad_request(exc)
+
+    return jsonify({
+        'items': [_serialise(row, fields) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'server_time': server_time.isoformat(),
+    })
+
+
+@bp.route('/products')
+@login_required
+def products():
+    return _collection(Product, PRODUCT_FIELDS, PRODUCT_FIELDS, Product.updated_at)
+
+@bp.route('/stock')
+@login_required
+def stock():
+    # Same rows as /products, trimmed by default to what a till needs to refresh its stock levels
+    return _collection(Product, PRODUCT_FIELDS, ('id', 'quantity', 'updated_at'), Product.updated_at)
+
+@bp.route('/sales')
+@login_required
+def sales():
+    default_fields = [name for name in SALE_FIELDS if name not in SALE_JOINS]
+    return _collection(Sale, SALE_FIELDS, default_fields, Sale.timestamp, joins=SALE_JOINS)
@@ -0,0 +1,83 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import current_user, login_user, login_required, logout_user
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from models import db, User
+
+bp = Blueprint('auth', __name__)
+
+
+@bp.route('/')
+def home():
+    if current_user.is_authenticated:
+        return redirect(url_for('reports.dashboard'))
+    return redirect(url_for('auth.login'))
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        full_name = request.form.get('full_name')
+        email = request.form.get('email')
+        phone_number = request.form.get('phone_number')
+        password = request.form.get('password')
+
+        # Basic validation
+        if not username or not full_name or not email or not password:
+            return "Please fill all required fields", 400
+
+        if User.query.filter_by(username=username).first():
+            return "Username already exists", 400
+
+        if User.query.filter_by(email=email).first():
+            return "Email already exists", 400
+
+        if phone_number and User.query.filter_by(phone_number=phone_number).first():
+            return "Phone number already exists", 400
+
+        hashed_password = generate_password_hash(password)
+
+        user = User(
+            username=username,
+            full_name=full_name,
+            email=email,
+            phone_number=phone_number,
+            password=hashed_password,
+            role='user',          # default role
+            is_approved=False     # default not approved
+        )
+
+        db.session.add(user)
+        db.session.commit()
+
+        return redirect(url_for('auth.login'))
+
+    return render_template('register.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+
+        user = User.query.filter_by(username=username).first()
+        if user and check_password_hash(user.password, password):
+            if not user.is_approved:
+                flash('Your account is pending admin approval.', 'warning')
+                return redirect(url_for('auth.login'))
+
+            login_user(user)
+            flash('Logged in successfully.', 'success')
+            return redirect(url_for('reports.dashboard'))
+
+        flash('Invalid username or password.', 'danger')
+
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required
+
+from blueprints.helpers import paginate
+from models import db, Expense
+from page_cache import cached_page
+from rollups import add_expense_rollup
+from totals import adjust_totals
+
+bp = Blueprint('expenses', __name__)
+
+
+@bp.route('/expenses', methods=['GET', 'POST'])
+@cached_page('expense')
+def expenses():
+    if request.method == 'POST':
+        description = request.form['description']
+        amount = float(request.form['amount'])
+        new_expense = Expense(description=description, amount=amount, timestamp=datetime.utcnow())
+        db.session.add(new_expense)
+        adjust_totals(expenses=amount)
+        add_expense_rollup(new_expense.timestamp, amount)
+        db.session.commit()
+        return redirect(url_for('expenses.expenses'))
+
+    page = paginate(Expense.query, [Expense.id])
+    return render_template('expenses.html', expenses=page.items, page=page)
+
+@bp.route('/expenses/edit/<int:expense_id>', methods=['GET', 'POST'])
+def edit_expense(expense_id):
+    expense = Expense.query.get_or_404(expense_id)
+    if request.method == 'POST':
+        old_amount = expense.amount
+        expense.description = request.form['description']
+        expense.amount = float(request.form['amount'])
+        adjust_totals(expenses=expense.amount - old_amount)
+        add_expense_rollup(expense.timestamp, expense.amount - old_amount)
+        db.session.commit()
+        flash("Expense updated successfully", "success")
+        return redirect(url_for('expenses.expenses'))
+
+    return render_template('edit_expense.html', expense=expense)
+
+@bp.route('/expenses/delete/<int:expense_id>', methods=['POST'])
+def delete_expense(expense_id):
+    expense = Expense.query.get_or_404(expense_id)
+    db.session.delete(expense)
+    adjust_totals(expenses=-expense.amount)
+    add_expense_rollup(expense.timestamp, -expense.amount)
+    db.session.commit()
+    flash("Expense deleted successfully", "success")
+    return redirect(url_for('expenses.expenses'))
+
+@bp.route('/expense', methods=['GET', 'POST'])
+@login_required
+def record_expense():
+    if request.method == 'POST':
+        description = request.form['description']
+        amount = float(request.form['amount'])
+        expense = Expense(description=description, amount=amount, timestamp=datetime.utcnow())
+        db.session.add(expense)
+        adjust_totals(expenses=amount)
+        add_expense_rollup(expense.timestamp, amount)
+        db.session.commit()
+        return redirect(url_for('reports.dashboard'))
+    return render_template('record_expense.html')
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import abort, request
+from flask_login import current_user
+
+from queries import get_page_size, keyset_page
+
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin():
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def approver_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not (current_user.is_admin() or current_user.is_approver()):
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def paginate(query, keys, descending=False):
+    """Keyset-paginate a listing from the `after`/`before`/`per_page` query args."""
+    page_size = get_page_size(request.args.get('per_page'))
+    after = request.args.get('after')
+    before = request.args.get('before')
+    try:
+        return keyset_page(query, keys, after=after, before=before, page_size=page_size, descending=descending)
+    except ValueError:
+        # Ignore a tampered or stale cursor and start from the first page
+        return keyset_page(query, keys, page_size=page_size, descending=descending)
+
+def parse_date_range(start_date_str, end_date_str):
+    """Parse YYYY-MM-DD bounds into a half-open [start, end) datetime range.
+
+    The end date is inclusive for the user, so one day is added to it. Badly
+    formatted input is ignored and yields (None, None).
+    """
+    try:
+        start_date = datetime.strptime(start_date_str, "%Y-%m-%d") if start_date_str else None
+        end_date = datetime.strptime(end_date_str, "%Y-%m-%d") if end_date_str else None
+    except ValueError:
+        return None, None
+    if end_date:
+        end_date = end_date + timedelta(days=1)
+    return start_date, end_date
@@ -0,0 +1,155 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import current_user, login_required
+
+from blueprints.helpers import paginate
+from importer import import_products
+from models import db, Product
+from page_cache import cached_page
+from restock import apply_restock, read_form_lines, read_manifest
+from search import product_name_filter
+from stock_ledger import record_movement
+from totals import adjust_totals
+from velocity import current_reorder_forecast, reorder_summary
+
+bp = Blueprint('products', __name__)
+
+# The most urgent lines shown on the reorder page; the rest are only counted
+REORDER_PAGE_LIMIT = 500
+
+
+@bp.route('/products')
+@login_required
+@cached_page('product')
+def index():
+    search = request.args.get('q')
+    products_query = Product.query
+    if search:
+        products_query = products_query.filter(product_name_filter(search))
+    page = paginate(products_query, [Product.id])
+    return render_template('index.html', products=page.items, page=page)
+
+@bp.route('/add', methods=['GET', 'POST'])
+@login_required
+def add_product():
+    if request.method == 'POST':
+        name = request.form['name']
+        quantity = int(request.form['quantity'])
+        cost_price = float(request.form['cost_price'])
+        price = float(request.form['price'])
+        new_product = Product(name=name, quantity=quantity, cost_price=cost_price, price=price)
+        db.session.add(new_product)
+        db.session.flush()  # assigns the id the ledger row refers to
+        adjust_totals(stock=quantity)
+        record_movement(new_product.id, quantity, 'create', user_id=current_user.id)
+        db.session.commit()
+        return redirect(url_for('products.index'))
+    return render_template('add_product.html')
+
+@bp.route('/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+def edit_product(id):
+    product = Product.query.get_or_404(id)
+    if request.method == 'POST':
+        old_quantity = product.quantity
+        product.name = request.form['name']
+        product.quantity = int(request.form['quantity'])
+        product.price = float(request.form['price'])
+        adjust_totals(stock=product.quantity - old_quantity)
+        record_movement(product.id, product.quantity - old_quantity, 'edit', user_id=current_user.id)
+        db.session.commit()
+        return redirect(url_for('products.index'))
+    return render_template('edit_product.html', product=product)
+
+@bp.route('/delete/<int:id>')
+@login_required
+def delete_product(id):
+    product = Product.query.get_or_404(id)
+    db.session.delete(product)
+    adjust_totals(stock=-product.quantity)
+    record_movement(product.id, -product.quantity, 'delete', user_id=current_user.id)
+    db.session.commit()
+    return redirect(url_for('products.index'))
+
+@bp.route('/products/import', methods=['GET', 'POST'])
+@login_required
+def import_products_view():
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash("Choose a CSV or XLSX file to import.", "danger")
+            return redirect(url_for('products.import_products_view'))
+        try:
+            result = import_products(upload.stream, upload.filename)
+        except ValueError as exc:
+            flash(str(exc), "danger")
+            return redirect(url_for('products.import_products_view'))
+    return render_template('import_products.html', result=result)
+
+@bp.route('/restock', methods=['GET', 'POST'])
+@login_required
+@cached_page('product')
+def restock_product():
+    if request.method == 'POST':
+        product_id = int(request.form['product_id'])
+        additional_quantity = int(request.form['quantity'])
+        new_price = float(request.form['price'])
+
+        product = Product.query.get_or_404(product_id)
+        product.quantity += additional_quantity
+        product.price = new_price  # update price to new value
+        adjust_totals(stock=additional_quantity)
+        record_movement(product.id, additional_quantity, 'restock', user_id=current_user.id)
+        db.session.commit()
+        return redirect(url_for('products.index'))
+
+    products = db.session.query(Product.id, Product.name, Product.price).order_by(Product.name).all()
+    return render_template('restock_product.html', products=products)
+
+@bp.route('/restock/bulk', methods=['GET', 'POST'])
+@login_required
+def bulk_restock():
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        try:
+            if upload and upload.filename:
+                records = read_manifest(upload.stream, upload.filename)
+            else:
+                records = read_form_lines(request.form)
+            result = apply_restock(records)
+        except ValueError as exc:
+            flash(str(exc), "danger")
+            return redirect(url_for('products.bulk_restock'))
+    return render_template('bulk_restock.html', result=result)
+
+@bp.route('/products/reorder')
+@login_required
+def reorder():
+    lead_days = request.args.get('lead_days', type=int)
+    cover_days = request.args.get('cover_days', type=int)
+    show_all = bool(request.args.get('all'))
+    forecast = current_reorder_forecast(lead_days, cover_days, due_only=not show_all)
+    count, order_cost, items = reorder_summary(forecast, limit=REORDER_PAGE_LIMIT, due_only=not show_all)
+    return render_template('reorder.html', items=items, count=count, order_cost=order_cost, show_all=show_all,
+                           listed=len(forecast) if show_all else count, limit=REORDER_PAGE_LIMIT,
+                           lead_days=lead_days or '', cover_days=cover_days or '')
+
+@bp.route('/products/lookup')
+@login_required
+def product_lookup():
+    """Small JSON name search used by the bulk restock form instead of a full dropdown."""
+    search = request.args.get('q', '').strip()
+    if not search:
+        return jsonify([])
+    products = (
+        db.session.query(Product.id, Product.name, Product.price, Product.quantity)
+        .filter(product_name_filter(search))
+        .order_by(Product.name)
+        .limit(20)
+        .all()
+    )
+    return jsonify([
+        {'id': p.id, 'name': p.name, 'price': p.price, 'quantity': p.quantity}
+        for p in products
+    ])
@@ -0,0 +1,279 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+from flask import (
+    Blueprint, current_app, render_template, request, redirect, url_for, send_file, flash, abort, jsonify,
+    Response, stream_with_context,
+)
+from flask_login import current_user, login_required
+
+from blueprints.helpers import parse_date_range
+from exports import (
+    DEFAULT_XLSX_MAX_ROWS, EXPORT_FORMATS, default_export_format, stream_csv, stream_sales_export, stream_xlsx,
+)
+from jobs import JobLimitReached, job_runner
+from live_updates import DEFAULT_KEEPALIVE_SECONDS, TooManySubscribers, get_broker, stream_events
+from models import Product, ExportJob
+from pnl import PNL_MIMETYPE, build_pnl, write_pnl_workbook
+from queries import sales_projection, sales_source, filter_sales_by_date
+from reporting import reporting_view
+from rollups import GRANULARITIES, default_period, period_series
+from stock_ledger import STOCK_EXPORT_HEADERS, stock_as_of, stock_export_rows
+from totals import get_totals_and_seq
+from velocity import due_reorders
+
+bp = Blueprint('reports', __name__)
+
+DASHBOARD_REORDER_ITEMS = 5
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    # The live stream resumes right after the last event these totals include
+    totals, live_seq = get_totals_and_seq()
+    total_sales = totals['total_sales']
+    total_expenses = totals['total_expenses']
+    total_stock = totals['total_stock']
+    total_cogs = totals['total_cogs']
+
+    profit = total_sales - total_cogs - total_expenses
+
+    # Chart period and bucket size; the charts read only the daily rollups
+    default_start, default_end = default_period()
+    try:
+        start_date = datetime.strptime(request.args['start_date'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        start_date = default_start
+    try:
+        end_date = datetime.strptime(request.args['end_date'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        end_date = default_end
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        granularity = 'month'
+
+    series = period_series(start_date, end_date, granularity)
+    reorder_count, reorder_items = due_reorders(DASHBOARD_REORDER_ITEMS)
+
+    return render_template('dashboard.html', 
+                           total_sales=total_sales, 
+                           total_expenses=total_expenses, 
+                           total_stock=total_stock,
+                           profit=profit,
+                           totals=totals,
+                           series=series,
+                           start_date=start_date.isoformat(),
+                           end_date=end_date.isoformat(),
+                           granularity=granularity,
+                           reorder_count=reorder_count,
+                           reorder_items=reorder_items,
+                           live_seq=live_seq)
+
+@bp.route('/dashboard/stream')
+@login_required
+def dashboard_stream():
+    """Server-sent events carrying the deltas of each committed sale, expense and stock change.
+
+    Only the replay is read here; the generator does not keep the request
+    context, so an open dashboard holds a worker thread but no database
+    connection, and this process's broker polls for new events on its behalf.
+    EventSource sends Last-Event-ID when it reconnects; the first connection
+    passes the sequence the page was rendered at as ?after=.
+    """
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after') or '')
+    except ValueError:
+        after = None
+    broker = get_broker()
+    try:
+        subscription, replay = broker.subscribe(after)
+    except TooManySubscribers:
+        abort(503)
+
+    keepalive = current_app.config.get('LIVE_KEEPALIVE_SECONDS', DEFAULT_KEEPALIVE_SECONDS)
+    response = Response(stream_events(subscription, replay, keepalive), mimetype='text/event-stream')
+    # Runs even if the client goes away before the first event is sent
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/export/products')
+@login_required
+@reporting_view
+def export_products():
+    # pandas is only needed here, so keep it off the import path of every worker
+    import pandas as pd
+
+    products = Product.query.all()
+    data = [{'Name': p.name, 'Quantity': p.quantity, 'Price': p.price} for p in products]
+    df = pd.DataFrame(data)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Products')
+    output.seek(0)
+    return send_file(output, as_attachment=True, download_name='products.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+@bp.route('/export/sales')
+@login_required
+@reporting_view
+def export_sales():
+    start_date, end_date = parse_date_range(request.args.get('start_date'), request.args.get('end_date'))
+
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = default_export_format(
+            start_date, end_date, current_app.config.get('EXPORT_XLSX_MAX_ROWS', DEFAULT_XLSX_MAX_ROWS),
+        )
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+
+    download_name, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(
+        stream_with_context(stream_sales_export(fmt, start_date, end_date)),
+        mimetype=mimetype,
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    return response
+
+@bp.route('/export/pnl')
+@login_required
+@reporting_view
+def export_pnl():
+    start_date, end_date = parse_date_range(request.args.get('start_date'), request.args.get('end_date'))
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        abort(400)
+
+    sheets = build_pnl(start_date, end_date, granularity, detail=bool(request.args.get('detail')))
+    return send_file(io.BytesIO(write_pnl_workbook(sheets)), as_attachment=True,
+                     download_name='profit_and_loss.xlsx', mimetype=PNL_MIMETYPE)
+
+def _parse_as_of():
+    """Return (as_of date, end of that day) from ?as_of=YYYY-MM-DD, defaulting to today."""
+    try:
+        as_of = datetime.strptime(request.args['as_of'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        as_of = datetime.utcnow().date()
+    return as_of, datetime.combine(as_of, datetime.min.time()) + timedelta(days=1)
+
+@bp.route('/reports/stock')
+@login_required
+@reporting_view
+def stock_report():
+    as_of, at = _parse_as_of()
+    try:
+        rows = stock_as_of(at)
+    except ValueError as exc:
+        flash(str(exc), "warning")
+        rows = []
+    total_units = sum(row.quantity for row in rows)
+    total_value = sum(row.quantity * row.cost_price for row in rows)
+    return render_template('stock_as_of.html', rows=rows, as_of=as_of.isoformat(),
+                           total_units=total_units, total_value=total_value)
+
+@bp.route('/export/stock')
+@login_required
+@reporting_view
+def export_stock():
+    as_of, at = _parse_as_of()
+    fmt = request.args.get('format', 'xlsx')
+    if fmt not in ('xlsx', 'csv'):
+        abort(400)
+    try:
+        rows = stock_export_rows(stock_as_of(at))
+    except ValueError as exc:
+        flash(str(exc), "warning")
+        return redirect(url_for('reports.stock_report', as_of=as_of.isoformat()))
+
+    if fmt == 'csv':
+        body, mimetype = stream_csv(rows, STOCK_EXPORT_HEADERS), 'text/csv'
+    else:
+        body, mimetype = stream_xlsx(rows, STOCK_EXPORT_HEADERS, sheet_name='Stock'), EXPORT_FORMATS['xlsx'][1]
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=stock-{as_of.isoformat()}.{fmt}'
+    return response
+
+
+@bp.route('/jobs')
+@login_required
+def list_jobs():
+    jobs = ExportJob.query.filter_by(user_id=current_user.id).order_by(ExportJob.created_at.desc()).limit(50).all()
+    return render_template('jobs.html', jobs=jobs)
+
+@bp.route('/jobs/export', methods=['POST'])
+@login_required
+def queue_export():
+    params = {
+        'format': request.form.get('format', 'xlsx'),
+        'start_date': request.form.get('start_date') or None,
+        'end_date': request.form.get('end_date') or None,
+        'granularity': request.form.get('granularity', 'month'),
+        'detail': bool(request.form.get('detail')),
+    }
+    try:
+        job_runner.submit(current_user.id, request.form.get('kind', 'sales'), params)
+    except (JobLimitReached, ValueError) as exc:
+        flash(str(exc), "warning")
+    else:
+        flash("Export queued. It will be ready to download here shortly.", "success")
+    return redirect(url_for('reports.list_jobs'))
+
+def _get_job_or_404(job_id):
+    job = ExportJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id and not current_user.is_admin():
+        abort(404)
+    return job
+
+@bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = _get_job_or_404(job_id)
+    return jsonify({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'rows_written': job.rows_written,
+        'error': job.error,
+        'download_url': url_for('reports.download_job', job_id=job.id) if job.status == 'done' else None,
+    })
+
+@bp.route('/jobs/<job_id>/download')
+@login_required
+def download_job(job_id):
+    job = _get_job_or_404(job_id)
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        abort(404)
+    return send_file(job.file_path, as_attachment=True, download_name=job.download_name, mimetype=job.mimetype)
+
+@bp.route('/export')
+@login_required
+@reporting_view
+def export_reports():
+    # Get optional start and end date from query params
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+
+    # Parse dates if provided; bad formats are ignored and the end date is inclusive
+    start_date, end_date = parse_date_range(start_date_str, end_date_str)
+
+    source = sales_source(start_date)
+    sales = filter_sales_by_date(sales_projection(source), start_date, end_date, source).order_by(source.c.id).all()
+
+    sales_data = []
+    for s in sales:
+        sales_data.append({
+            'id': s.id,
+            'product_name': s.product_name or "Unknown Product",
+            'quantity': s.quantity,
+            'unit_price': s.unit_price,
+            'total_price': s.total_price,
+            'Comments': s.comments,
+            'username': s.username or '',
+            'timestamp': s.timestamp.strftime("%Y-%m-%d") if s.timestamp else ''
+        })
+
+    return render_template('export_reports.html', sales=sales_data, start_date=start_date_str or '', end_date=end_date_str or '')
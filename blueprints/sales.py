@@ -0,0 +1,125 @@
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, abort, jsonify
+from flask_login import current_user, login_required
+
+from blueprints.helpers import paginate
+from checkout import InsufficientStock, UnknownProduct, checkout, first_sale_id, parse_cart
+from models import db, Product, Sale
+from page_cache import cached_page
+from queries import sales_projection
+from reporting import reporting_view
+from search import product_name_filter
+
+bp = Blueprint('sales', __name__)
+
+
+@bp.route('/sale', methods=['GET', 'POST'])
+@login_required
+@cached_page('product')
+def record_sale():
+    if request.method == 'POST':
+        customer_name = request.form.get('customer_name', '').strip()
+        payment_type = request.form.get('payment_type', 'Cash')
+        comments = request.form.get('comments', '').strip()
+
+        try:
+            lines = parse_cart(request.form)
+        except ValueError as exc:
+            return str(exc), 400
+
+        try:
+            # ✅ Automatically associate the logged-in user
+            order_ref = checkout(lines, current_user.id, customer_name, payment_type, comments)
+        except UnknownProduct:
+            abort(404)
+        except InsufficientStock:
+            return "Insufficient stock", 400
+        db.session.commit()
+
+        flash("Sale recorded successfully!", "success")
+        current_app.logger.info("Sale %s recorded by user %s", order_ref, current_user.username)
+
+        return redirect(url_for('sales.view_receipt', sale_id=first_sale_id(order_ref)))
+
+    products = Product.query.all()
+    return render_template('record_sale.html', products=products)
+
+@bp.route('/test_user')
+@login_required
+@reporting_view
+def test_user():
+    # current logged-in user info
+    current_user_info = {
+        "id": current_user.id,
+        "username": current_user.username,
+        "full_name": current_user.full_name,
+        "email": current_user.email,
+    }
+
+    # get all sales with user info
+    sales = sales_projection().all()
+    sales_data = []
+    for sale in sales:
+        sales_data.append({
+            "sale_id": sale.id,
+            "product": sale.product_name,
+            "quantity": sale.quantity,
+            "total_price": sale.total_price,
+            "sold_by_username": sale.username,
+            "sold_by_full_name": sale.user_full_name,
+        })
+
+    return jsonify({
+        "current_user": current_user_info,
+        "sales": sales_data,
+    })
+
+
+
+@bp.route('/receipt/<int:sale_id>')
+@login_required
+def view_receipt(sale_id):
+    sale = Sale.query.get_or_404(sale_id)
+    lines_query = db.session.query(Sale, Product.name).outerjoin(Product, Sale.product_id == Product.id)
+    if sale.order_ref:
+        lines = lines_query.filter(Sale.order_ref == sale.order_ref).order_by(Sale.id).all()
+    else:
+        lines = lines_query.filter(Sale.id == sale.id).all()
+    grand_total = sum(line.unit_price * line.quantity for line, _ in lines)
+    return render_template('receipt.html', sale=sale, lines=lines, grand_total=grand_total)
+
+
+@bp.route('/sales')
+@login_required
+@cached_page('sale', 'product')
+def sales_list():
+    search = request.args.get('q', '').strip()
+    sales_query = sales_projection()
+
+    if search:
+        sales_query = sales_query.filter(product_name_filter(search, Sale.product_id))
+
+    page = paginate(sales_query, [Sale.timestamp, Sale.id], descending=True)
+
+    sales_data = []
+    for s in page.items:
+        sales_data.append({
+            'id': s.id,  # Add this line
+            'product_name': s.product_name or "Unknown Product",
+            'quantity': s.quantity,
+            'unit_price': s.unit_price,
+            'total_price': s.total_price,
+            'customer_name': s.customer_name,
+            'payment_type': s.payment_type,
+            'comments': s.comments,
+            'timestamp': s.timestamp.strftime("%Y-%m-%d %H:%M") if s.timestamp else '',
+            'username': s.username or '-'
+        })
+
+    return render_template('sales_list.html', sales=sales_data, page=page)
+
+"""
+@app.route('/receipt/<int:sale_id>')
+def view_receipt(sale_id):
+    sale = Sale.query.get_or_404(sale_id)
+    return render_template('receipt.html', sale=sale)
+"""
@@ -0,0 +1,135 @@
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, update
+
+from importer import parse_number
+from models import db, Product, Sale
+from rollups import add_sale_rollup
+from stock_ledger import record_movements
+from totals import adjust_totals
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class UnknownProduct(CheckoutError):
+    pass
+
+
+class InsufficientStock(CheckoutError):
+    def __init__(self, product_ids):
+        super().__init__(f"Insufficient stock for product(s) {', '.join(map(str, product_ids))}")
+        self.product_ids = product_ids
+
+
+def parse_cart(form):
+    """Read parallel product_id / quantity / unit_price fields into cart lines.
+
+    A single-item form posts one value per field, so it is simply a one-line cart.
+    """
+    product_ids = form.getlist('product_id')
+    quantities = form.getlist('quantity')
+    unit_prices = form.getlist('unit_price')
+    if not product_ids or not (len(product_ids) == len(quantities) == len(unit_prices)):
+        raise ValueError("Every line needs a product, quantity and unit price")
+
+    lines = []
+    for product_id, quantity, unit_price in zip(product_ids, quantities, unit_prices):
+        line = {
+            'product_id': int(product_id),
+            'quantity': int(quantity),
+            'unit_price': parse_number(unit_price, float, 'unit price'),
+        }
+        if line['quantity'] <= 0:
+            raise ValueError("Quantity must be positive")
+        if line['unit_price'] < 0:
+            raise ValueError("Unit price cannot be negative")
+        lines.append(line)
+    return lines
+
+
+def checkout(lines, user_id, customer_name=None, payment_type='Cash', comments=None):
+    """Record every line of a basket as one order in the current transaction.
+
+    Stock for all products is checked and decremented with one batched
+    conditional UPDATE and the sale rows are bulk-inserted, so the number of
+    statements does not grow with basket size. Raises UnknownProduct or
+    InsufficientStock (after rolling back) if any line cannot be filled;
+    otherwise returns the order reference. The caller commits.
+    """
+    wanted = OrderedDict()
+    for line in lines:
+        wanted[line['product_id']] = wanted.get(line['product_id'], 0) + line['quantity']
+
+    products = {
+        row.id: row
+        for row in db.session.query(Product.id, Product.cost_price, Product.quantity)
+        .filter(Product.id.in_(wanted))
+    }
+    missing = [product_id for product_id in wanted if product_id not in products]
+    if missing:
+        raise UnknownProduct(missing)
+    short = [product_id for product_id, quantity in wanted.items() if products[product_id].quantity < quantity]
+    if short:
+        raise InsufficientStock(short)
+
+    # The read above is only a fast path; the conditional UPDATE is what
+    # guarantees no oversell if another checkout raced us since.
+    decrement = (
+        update(Product.__table__)
+        .where(Product.__table__.c.id == bindparam('pid'), Product.__table__.c.quantity >= bindparam('qty'))
+        .values(quantity=Product.__table__.c.quantity - bindparam('qty'))
+    )
+    result = db.session.execute(decrement, [{'pid': pid, 'qty': qty} for pid, qty in wanted.items()])
+    if result.rowcount != len(wanted):
+        db.session.rollback()
+        raise InsufficientStock(list(wanted))
+
+    order_ref = uuid.uuid4().hex
+    timestamp = datetime.utcnow()
+    rows = []
+    for line in lines:
+        cost_price = products[line['product_id']].cost_price
+        rows.append({
+            'order_ref': order_ref,
+            'product_id': line['product_id'],
+            'quantity': line['quantity'],
+            'cost_price': cost_price,
+            'unit_price': line['unit_price'],
+            'total_price': line['unit_price'] * line['quantity'],
+            'customer_name': customer_name or None,
+            'payment_type': payment_type,
+            'comments': comments or None,
+            'user_id': user_id,
+            'timestamp': timestamp,
+        })
+    db.session.execute(insert(Sale), rows)
+    record_movements(
+        [{'product_id': pid, 'change': -qty, 'reason': 'sale', 'ref': order_ref, 'user_id': user_id}
+         for pid, qty in wanted.items()],
+        timestamp,
+    )
+
+    per_product = OrderedDict()
+    for row in rows:
+        revenue, cogs, units = per_product.get(row['product_id'], (0, 0, 0))
+        per_product[row['product_id']] = (
+            revenue + row['total_price'],
+            cogs + row['cost_price'] * row['quantity'],
+            units + row['quantity'],
+        )
+    for product_id, (revenue, cogs, units) in per_product.items():
+        add_sale_rollup(timestamp, product_id, revenue, cogs, units)
+    adjust_totals(
+        sales=sum(revenue for revenue, _, _ in per_product.values()),
+        cogs=sum(cogs for _, cogs, _ in per_product.values()),
+        stock=-sum(units for _, _, units in per_product.values()),
+    )
+    return order_ref
+
+
+def first_sale_id(order_ref):
+    return db.session.query(func.min(Sale.id)).filter(Sale.order_ref == order_ref).scalar()
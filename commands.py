@@ -0,0 +1,89 @@
+import click
+from flask import current_app
+
+from archive import archive_sales, default_cutoff
+from importer import import_products
+from jobs import cleanup_jobs
+from migrations import upgrade_db
+from rollups import backfill_rollups
+from stock_ledger import take_snapshot
+from totals import reconcile_totals
+from velocity import refresh_velocity
+
+
+@click.command('reconcile-totals')
+def reconcile_totals_command():
+    """Rebuild the dashboard totals from the base tables and report any drift."""
+    drift = reconcile_totals()
+    if not drift:
+        print("Totals are in sync.")
+    for field, (stored, actual) in drift.items():
+        print(f"{field}: stored {stored} != actual {actual} (drift {stored - actual:+})")
+
+@click.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_products_command(path):
+    """Upsert products by name from a CSV or XLSX file."""
+    with open(path, 'rb') as stream:
+        result = import_products(stream, path)
+    print(f"Inserted {result.inserted}, updated {result.updated}, rejected {result.error_count} row(s).")
+    for row_number, message in result.errors:
+        print(f"  row {row_number}: {message}")
+
+@click.command('cleanup-jobs')
+@click.option('--hours', type=int, default=None, help='Keep jobs newer than this (default EXPORT_JOB_RETENTION_HOURS).')
+def cleanup_jobs_command(hours):
+    """Delete finished export jobs and their files past the retention period."""
+    removed = cleanup_jobs(hours if hours is not None else current_app.config['EXPORT_JOB_RETENTION_HOURS'])
+    print(f"Removed {removed} job(s).")
+
+@click.command('archive-sales')
+@click.option('--days', type=int, default=None, help='Archive sales older than this (default ARCHIVE_AFTER_DAYS).')
+def archive_sales_command(days):
+    """Move old sales into the archive table; reports still include them when asked."""
+    cutoff = default_cutoff(days if days is not None else current_app.config['ARCHIVE_AFTER_DAYS'])
+    moved = archive_sales(cutoff)
+    print(f"Archived {moved} sale(s) older than {cutoff:%Y-%m-%d}.")
+
+@click.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild the daily sales and expense rollups from the raw tables."""
+    backfill_rollups()
+    refresh_velocity(full=True)  # its windows were slid over the old rollups
+    print("Rollups rebuilt.")
+
+@click.command('refresh-velocity')
+@click.option('--full', is_flag=True, help='Rebuild from the rollups instead of sliding forward.')
+def refresh_velocity_command(full):
+    """Bring the per-product sales velocity index up to yesterday."""
+    refreshed = refresh_velocity(full=full)
+    print("Sales velocity refreshed." if refreshed else "Sales velocity is already up to date.")
+
+@click.command('snapshot-stock')
+def snapshot_stock_command():
+    """Snapshot every product's stock; run daily so stock-as-of reports stay fast."""
+    run_id = take_snapshot()
+    print(f"Stock snapshot {run_id} taken.")
+
+@click.command('upgrade-db')
+def upgrade_db_command():
+    """Create missing tables and apply pending schema changes."""
+    upgrade_db()
+    print("Database is up to date.")
+
+
+COMMANDS = (
+    reconcile_totals_command,
+    import_products_command,
+    cleanup_jobs_command,
+    archive_sales_command,
+    backfill_rollups_command,
+    refresh_velocity_command,
+    snapshot_stock_command,
+    upgrade_db_command,
+)
+
+
+def register_commands(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
@@ -0,0 +1,146 @@
+import csv
+import io
+import tempfile
+import zlib
+
+from sqlalchemy import func
+
+from models import db, Product
+from queries import sales_projection, sales_source, filter_sales_by_date
+
+EXPORT_CHUNK_SIZE = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+# Larger ranges default to CSV: an xlsx file can only be sent once it is complete
+DEFAULT_XLSX_MAX_ROWS = 50000
+
+SALES_EXPORT_HEADERS = [
+    'Product', 'Quantity', 'Unit Price', 'Total Price', 'Customer Name',
+    'Payment Type', 'Comments', 'Sold By', 'Timestamp',
+]
+
+PRODUCT_EXPORT_HEADERS = ['Name', 'Quantity', 'Price']
+
+EXPORT_FORMATS = {
+    'xlsx': ('sales.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('sales.csv', 'text/csv'),
+    'csv.gz': ('sales.csv.gz', 'application/gzip'),
+}
+
+
+def iter_sales_rows(start_date=None, end_date=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows for the given date range, reading `chunk_size` sales at a time.
+
+    Chunks are fetched by primary key (keyset), so each query is an index range
+    scan and only one chunk of plain tuples is held in memory at any point.
+    Archived sales are included when the range reaches back into them.
+    """
+    source = sales_source(start_date)
+    last_id = 0
+    while True:
+        query = filter_sales_by_date(sales_projection(source), start_date, end_date, source)
+        rows = query.filter(source.c.id > last_id).order_by(source.c.id).limit(chunk_size).all()
+        if not rows:
+            return
+
+        for row in rows:
+            yield [
+                row.product_name or 'Unknown',
+                row.quantity,
+                row.unit_price,
+                row.total_price,
+                row.customer_name,
+                row.payment_type,
+                row.comments,
+                row.username or 'N/A',
+                row.timestamp.strftime('%Y-%m-%d %H:%M:%S') if row.timestamp else '',
+            ]
+        last_id = rows[-1].id
+
+
+def count_sales(start_date=None, end_date=None):
+    source = sales_source(start_date)
+    query = db.session.query(func.count()).select_from(source)
+    return filter_sales_by_date(query, start_date, end_date, source).scalar()
+
+
+def iter_product_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield [name, quantity, price] for every product, `chunk_size` rows per query."""
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Product.id, Product.name, Product.quantity, Product.price)
+            .filter(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield [row.name, row.quantity, row.price]
+        last_id = rows[-1].id
+
+
+def stream_csv(rows, headers=SALES_EXPORT_HEADERS):
+    """Yield CSV text one chunk of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def stream_gzip(chunks):
+    """Gzip-compress an iterable of byte chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_xlsx(rows, headers=SALES_EXPORT_HEADERS, sheet_name='Sales'):
+    """Write rows through openpyxl's write-only mode and yield the finished file.
+
+    Write-only worksheets spill rows to disk as they are appended, so memory
+    stays flat; the packaged workbook is then read back in fixed-size chunks.
+    Unlike CSV nothing is sent until every row is written, since the zip
+    container can only be assembled at the end.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def default_export_format(start_date=None, end_date=None, max_rows=DEFAULT_XLSX_MAX_ROWS):
+    """xlsx for ranges of up to `max_rows` sales, otherwise CSV, which starts downloading at once."""
+    return 'xlsx' if count_sales(start_date, end_date) <= max_rows else 'csv'
+
+
+def stream_sales_export(fmt, start_date=None, end_date=None, rows=None):
+    if rows is None:
+        rows = iter_sales_rows(start_date, end_date)
+    if fmt == 'csv':
+        return stream_csv(rows)
+    if fmt == 'csv.gz':
+        return stream_gzip(stream_csv(rows))
+    return stream_xlsx(rows)
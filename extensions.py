@@ -0,0 +1,13 @@
+from flask_login import LoginManager
+
+from user_cache import load_cached_user
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+# API clients get a 401 instead of a redirect to the login page
+login_manager.blueprint_login_views = {'api': None}
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return load_cached_user(int(user_id))
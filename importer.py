@@ -0,0 +1,202 @@
+import math
+from zipfile import BadZipFile
+
+from sqlalchemy import bindparam, func, insert, update
+
+from models import db, Product
+from stock_ledger import record_movements
+from totals import adjust_totals
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 200
+
+# Accepted spellings of each column header, after lower-casing and trimming
+COLUMN_ALIASES = {
+    'name': 'name', 'product': 'name', 'product name': 'name',
+    'quantity': 'quantity', 'qty': 'quantity',
+    'price': 'price', 'min selling price': 'price', 'selling price': 'price',
+    'cost_price': 'cost_price', 'cost price': 'cost_price', 'cost': 'cost_price',
+    'id': 'id', 'product id': 'id', 'product_id': 'id',
+}
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def _normalise_header(header):
+    return COLUMN_ALIASES.get(str(header or '').strip().lower())
+
+
+def _read_csv(stream):
+    # pandas and openpyxl are imported where they are used; they dominate startup otherwise
+    import pandas as pd
+
+    # dtype=str keeps validation in our hands; chunksize bounds memory
+    reader = pd.read_csv(stream, dtype=str, keep_default_na=False, chunksize=IMPORT_BATCH_SIZE)
+    row_number = 1
+    for chunk in reader:
+        chunk.columns = [_normalise_header(c) for c in chunk.columns]
+        for record in chunk.to_dict('records'):
+            row_number += 1
+            yield row_number, record
+
+
+def _read_xlsx(stream):
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError) as exc:
+        # A renamed or truncated file is a bad upload, not a server error
+        raise ValueError("The file is not a readable .xlsx workbook") from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalise_header(h) for h in next(rows, [])]
+        for row_number, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == '' for v in values):
+                continue
+            yield row_number, dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename):
+    """Yield (row_number, record) from a CSV or XLSX upload, one chunk at a time."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return _read_xlsx(stream)
+    if filename.lower().endswith('.csv'):
+        return _read_csv(stream)
+    raise ValueError("Unsupported file type; upload a .csv or .xlsx file")
+
+
+def parse_number(value, cast, field, required=True):
+    """Parse a spreadsheet cell as a finite `cast` number; None if blank and not `required`.
+
+    Thousands separators are allowed. Anything else, including nan and inf,
+    raises ValueError with a message fit to show against the row.
+    """
+    if value is None or str(value).strip() == '':
+        if required:
+            raise ValueError(f"Missing {field}")
+        return None
+    try:
+        number = float(str(value).strip().replace(',', ''))
+        if not math.isfinite(number):
+            raise ValueError(value)
+        return cast(number)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid {field} '{value}'") from None
+
+
+def _number(record, field, cast, required=True):
+    label = field.replace('_', ' ')
+    number = parse_number(record.get(field), cast, label, required)
+    if number is not None and number < 0:
+        raise ValueError(f"{label.capitalize()} cannot be negative")
+    return number
+
+
+def validate_row(record):
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise ValueError("Missing name")
+    if len(name) > 100:
+        raise ValueError("Name is longer than 100 characters")
+    return {
+        'name': name,
+        'quantity': _number(record, 'quantity', int),
+        'price': _number(record, 'price', float),
+        'cost_price': _number(record, 'cost_price', float, required=False),
+    }
+
+
+def _apply_batch(batch, result):
+    """Upsert one batch of validated rows (keyed by product name) and commit."""
+    # Later rows for the same name win, as if applied in file order
+    by_name = {}
+    for row_number, row in batch:
+        by_name[row['name']] = (row_number, row)
+
+    existing = {}
+    for product_id, name, quantity in (
+        db.session.query(Product.id, Product.name, Product.quantity).filter(Product.name.in_(by_name))
+    ):
+        existing.setdefault(name, (product_id, quantity))
+
+    inserts, updates, movements = [], [], []
+    for name, (row_number, row) in by_name.items():
+        if name in existing:
+            product_id, old_quantity = existing[name]
+            updates.append({
+                'pid': product_id,
+                'new_quantity': row['quantity'],
+                'new_price': row['price'],
+                'new_cost_price': row['cost_price'],
+            })
+            movements.append({'product_id': product_id, 'change': row['quantity'] - old_quantity, 'reason': 'import'})
+        elif row['cost_price'] is None:
+            result.add_error(row_number, "Missing cost price for new product")
+        else:
+            inserts.append(row)
+
+    if inserts:
+        table = Product.__table__
+        created = db.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), inserts,
+        ).scalars().all()
+        movements.extend(
+            {'product_id': product_id, 'change': row['quantity'], 'reason': 'import'}
+            for product_id, row in zip(created, inserts)
+        )
+    if updates:
+        table = Product.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam('pid'))
+            .values(
+                quantity=bindparam('new_quantity'),
+                price=bindparam('new_price'),
+                cost_price=func.coalesce(bindparam('new_cost_price'), table.c.cost_price),
+            ),
+            updates,
+        )
+    record_movements(movements)
+    adjust_totals(stock=sum(movement['change'] for movement in movements))
+    db.session.commit()
+
+    result.inserted += len(inserts)
+    result.updated += len(updates)
+
+
+def import_products(stream, filename):
+    """Stream a product catalogue file into the database in batches.
+
+    Rows are validated one by one; invalid rows are reported and skipped.
+    Valid rows are upserted by product name with one bulk INSERT and one
+    batched UPDATE per IMPORT_BATCH_SIZE rows.
+    """
+    result = ImportResult()
+    batch = []
+    for row_number, record in read_rows(stream, filename):
+        try:
+            batch.append((row_number, validate_row(record)))
+        except ValueError as exc:
+            result.add_error(row_number, str(exc))
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            _apply_batch(batch, result)
+            batch = []
+    if batch:
+        _apply_batch(batch, result)
+    return result
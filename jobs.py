@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, or_, select, update
+
+from exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, PRODUCT_EXPORT_HEADERS,
+    count_sales, iter_product_rows, iter_sales_rows, stream_sales_export, stream_xlsx,
+)
+from models import db, Product, ExportJob
+from pnl import PNL_MIMETYPE, build_pnl, write_pnl_workbook
+from reporting import reporting_reads
+from rollups import GRANULARITIES
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ('sales', 'products', 'pnl')
+ACTIVE_STATUSES = ('queued', 'running')
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_ACTIVE_PER_USER = 2
+DEFAULT_RETENTION_HOURS = 24
+# A job whose owner has not renewed it for this long is taken to be orphaned
+DEFAULT_LEASE_SECONDS = 120
+
+_owner = {}
+
+
+class JobLimitReached(Exception):
+    pass
+
+
+def process_owner():
+    """host:pid:boot id naming this process as a job owner; the boot id tells apart a restart that reuses a pid."""
+    pid = os.getpid()
+    if pid not in _owner:
+        _owner.clear()  # a forked worker gets its own
+        _owner[pid] = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+    return _owner[pid]
+
+
+class JobRunner:
+    """Runs queued exports on a small thread pool, with job state kept in ExportJob.
+
+    Each job writes its output to EXPORT_JOB_DIR and records progress as it
+    goes, so the request that queued it returns at once and the browser polls
+    for status. Every job carries its owning process and a lease that a
+    heartbeat thread renews while that process has jobs in flight; a job
+    whose lease is older than EXPORT_JOB_LEASE_SECONDS belonged to a process
+    that died and is marked failed, by whichever worker notices first. The
+    pool lives in `app.extensions`, so every app built by the factory gets
+    its own.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('EXPORT_JOB_DIR', os.path.join(app.instance_path, 'exports'))
+        app.config.setdefault('EXPORT_JOB_WORKERS', DEFAULT_WORKERS)
+        app.config.setdefault('EXPORT_JOB_MAX_ACTIVE_PER_USER', DEFAULT_MAX_ACTIVE_PER_USER)
+        app.config.setdefault('EXPORT_JOB_RETENTION_HOURS', DEFAULT_RETENTION_HOURS)
+        app.config.setdefault('EXPORT_JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+        app.extensions['job_runner'] = {
+            'executor': ThreadPoolExecutor(
+                max_workers=app.config['EXPORT_JOB_WORKERS'], thread_name_prefix='export-job',
+            ),
+            'lock': threading.Lock(),
+            'in_flight': 0,
+            'heartbeat': None,
+        }
+
+    def _state(self, app=None):
+        return (app or current_app).extensions['job_runner']
+
+    def submit(self, user_id, kind, params):
+        """Persist a new job and hand it to the pool; returns the ExportJob.
+
+        Raises JobLimitReached if the user already has
+        EXPORT_JOB_MAX_ACTIVE_PER_USER jobs queued or running.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown export '{kind}'")
+        expire_orphaned_jobs(current_app.config['EXPORT_JOB_LEASE_SECONDS'])
+        cleanup_jobs(current_app.config['EXPORT_JOB_RETENTION_HOURS'])
+
+        # Count and insert in one statement: SQLite takes the write lock before
+        # the count is read, so two concurrent submits can't both slip under
+        limit = current_app.config['EXPORT_JOB_MAX_ACTIVE_PER_USER']
+        active = (
+            select(func.count()).select_from(ExportJob)
+            .where(ExportJob.user_id == user_id, ExportJob.status.in_(ACTIVE_STATUSES))
+            .scalar_subquery()
+        )
+        job_id, now = uuid.uuid4().hex, datetime.utcnow()
+        fields = {
+            'id': job_id, 'user_id': user_id, 'kind': kind, 'params': json.dumps(params),
+            'owner': process_owner(), 'heartbeat_at': now, 'created_at': now,
+        }
+        inserted = db.session.execute(insert(ExportJob).from_select(
+            list(fields), select(*[literal(value) for value in fields.values()]).where(active < limit),
+        ))
+        if inserted.rowcount == 0:
+            db.session.rollback()
+            raise JobLimitReached(f"You already have {limit} exports in progress")
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        self._track(app, 1)
+        try:
+            self._state()['executor'].submit(self._run, app, job_id)
+        except Exception:
+            self._track(app, -1)
+            raise
+        return db.session.get(ExportJob, job_id)
+
+    def _track(self, app, delta):
+        """Count this process's jobs in flight; the heartbeat runs while there are any."""
+        state = self._state(app)
+        with state['lock']:
+            state['in_flight'] += delta
+            if state['in_flight'] and state['heartbeat'] is None:
+                state['heartbeat'] = threading.Thread(
+                    target=self._heartbeat, args=(app,), name='export-job-heartbeat', daemon=True,
+                )
+                state['heartbeat'].start()
+
+    def _heartbeat(self, app):
+        state = self._state(app)
+        lease = app.config['EXPORT_JOB_LEASE_SECONDS']
+        while True:
+            time.sleep(lease / 4)
+            with state['lock']:
+                if not state['in_flight']:
+                    state['heartbeat'] = None
+                    return
+            try:
+                with app.app_context():
+                    renew_leases()
+                    expire_orphaned_jobs(lease)
+            except Exception:
+                logger.exception("Export job heartbeat failed")
+
+    def _run(self, app, job_id):
+        try:
+            with app.app_context():
+                self._run_job(app, job_id)
+        finally:
+            self._track(app, -1)
+
+    def _run_job(self, app, job_id):
+        claimed = db.session.execute(
+            update(ExportJob)
+            .where(ExportJob.id == job_id, ExportJob.status == 'queued', ExportJob.owner == process_owner())
+            .values(status='running', heartbeat_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if claimed.rowcount == 0:
+            return  # given up on as orphaned while it waited for a thread
+        job = db.session.get(ExportJob, job_id)
+        try:
+            # Progress updates are writes and still go to the main engine
+            with reporting_reads():
+                run_export(job, app.config['EXPORT_JOB_DIR'])
+            job.status = 'done'
+            job.progress = 100
+            # Clears an expiry recorded while this process was stalled: the file is complete
+            job.error = None
+        except Exception as exc:
+            logger.exception("Export job %s failed", job_id)
+            db.session.rollback()
+            job = db.session.get(ExportJob, job_id)
+            job.status = 'failed'
+            job.error = str(exc)[:300]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+job_runner = JobRunner()
+
+
+def _track_progress(job, rows, total):
+    """Pass rows through while recording progress on the job every chunk."""
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % EXPORT_CHUNK_SIZE == 0:
+            job.rows_written = written
+            job.progress = min(99, written * 100 // total) if total else 99
+            db.session.commit()
+    job.rows_written = written
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+def run_export(job, directory):
+    params = json.loads(job.params or '{}')
+    os.makedirs(directory, exist_ok=True)
+
+    if job.kind == 'sales':
+        fmt = params.get('format', 'xlsx')
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'")
+        start_date = _parse_date(params.get('start_date'))
+        end_date = _parse_date(params.get('end_date'))
+        if end_date:
+            end_date = end_date + timedelta(days=1)
+        rows = _track_progress(job, iter_sales_rows(start_date, end_date), count_sales(start_date, end_date))
+        chunks = stream_sales_export(fmt, rows=rows)
+        download_name, mimetype = EXPORT_FORMATS[fmt]
+    elif job.kind == 'pnl':
+        granularity = params.get('granularity', 'month')
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}'")
+        start_date = _parse_date(params.get('start_date'))
+        end_date = _parse_date(params.get('end_date'))
+        if end_date:
+            end_date = end_date + timedelta(days=1)
+        sheets = build_pnl(start_date, end_date, granularity, detail=params.get('detail', False))
+        chunks = [write_pnl_workbook(sheets)]
+        download_name, mimetype = 'profit_and_loss.xlsx', PNL_MIMETYPE
+    else:
+        rows = _track_progress(job, iter_product_rows(), db.session.query(Product.id).count())
+        chunks = stream_xlsx(rows, headers=PRODUCT_EXPORT_HEADERS, sheet_name='Products')
+        download_name, mimetype = 'products.xlsx', EXPORT_FORMATS['xlsx'][1]
+
+    path = os.path.join(directory, f"{job.id}-{download_name}")
+    with open(path, 'wb') as output:
+        for chunk in chunks:
+            output.write(chunk)
+
+    job.file_path = path
+    job.download_name = download_name
+    job.mimetype = mimetype
+
+
+def renew_leases():
+    """Extend the lease on every job this process has queued or running."""
+    db.session.execute(
+        update(ExportJob)
+        .where(ExportJob.owner == process_owner(), ExportJob.status.in_(ACTIVE_STATUSES))
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def expire_orphaned_jobs(lease_seconds):
+    """Fail other processes' jobs whose lease ran out; returns how many."""
+    now = datetime.utcnow()
+    expired = db.session.execute(
+        update(ExportJob)
+        .where(
+            ExportJob.status.in_(ACTIVE_STATUSES),
+            or_(ExportJob.owner.is_(None), ExportJob.owner != process_owner()),
+            or_(ExportJob.heartbeat_at.is_(None), ExportJob.heartbeat_at < now - timedelta(seconds=lease_seconds)),
+        )
+        .values(status='failed', error='Interrupted: the worker running it stopped', finished_at=now)
+    )
+    db.session.commit()
+    return expired.rowcount
+
+
+def cleanup_jobs(retention_hours):
+    """Delete finished jobs (and their files) older than `retention_hours`; returns the count."""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    old_jobs = ExportJob.query.filter(
+        ExportJob.created_at < cutoff, ExportJob.status.notin_(ACTIVE_STATUSES),
+    ).all()
+    for job in old_jobs:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+    return len(old_jobs)
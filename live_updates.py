@@ -0,0 +1,296 @@
+import json
+import logging
+import queue
+import threading
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import db, LiveEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SUBSCRIBERS = 100
+DEFAULT_KEEPALIVE_SECONDS = 15
+# How often each process looks for events committed by other workers
+DEFAULT_POLL_SECONDS = 1.0
+# How long EventSource waits before reconnecting a dropped stream
+RETRY_MS = 3000
+# Most events replayed to a dashboard that reconnects or connects just after rendering
+REPLAY_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 100
+POLL_BATCH = 200
+# LiveEvent rows kept for replay; older ones are deleted every PRUNE_EVERY events
+EVENT_RETENTION = 2000
+PRUNE_EVERY = 100
+
+TOTAL_FIELDS = ('total_sales', 'total_cogs', 'total_expenses', 'total_stock')
+
+_PENDING_KEY = 'live_update'
+_WRITTEN_KEY = 'live_update_written'
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, seq):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+        # Last event the stream has sent; the poller may hand over older ones
+        self.seq = seq
+
+
+def latest_seq():
+    """A scalar subquery for the id of the last committed live event (0 if none)."""
+    return select(func.coalesce(func.max(LiveEvent.id), 0)).scalar_subquery()
+
+
+def read_events(after, limit):
+    """Up to `limit` committed events after `after`, oldest first, as (seq, data) pairs."""
+    rows = db.session.execute(
+        select(LiveEvent.id, LiveEvent.data).where(LiveEvent.id > after).order_by(LiveEvent.id).limit(limit)
+    )
+    return [(seq, json.loads(data)) for seq, data in rows]
+
+
+class EventBroker:
+    """Fan-out of committed dashboard deltas to this process's open event streams.
+
+    Every transaction that changes the totals writes its deltas to LiveEvent
+    before it commits, so events carry one sequence for the whole database
+    whichever worker made the write, and a page rendered by one worker can
+    resume its stream on another. While any stream is open a single thread
+    per process reads the events after the last one it has seen, every
+    LIVE_POLL_SECONDS or as soon as a commit in this process wakes it, and
+    queues them for each listener. A listener that falls
+    SUBSCRIBER_QUEUE_SIZE events behind is cut off and told to resync. One
+    broker lives in `app.extensions` for every app built by the factory.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_subscribers = app.config.get('LIVE_MAX_SUBSCRIBERS', DEFAULT_MAX_SUBSCRIBERS)
+        self.poll_interval = app.config.get('LIVE_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._poller = None
+        self.last_seq = 0
+        self.published = 0
+
+    def subscribe(self, after=None):
+        """Register a listener; returns (subscription, events to replay first).
+
+        The replay is None when the events after `after` can't be replayed,
+        because there are more than REPLAY_SIZE of them, they have been
+        pruned, or `after` is ahead of the database; the listener must resync.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            start_poller = self._poller is None
+        latest = db.session.execute(select(latest_seq())).scalar()
+        subscription = Subscription(latest if after is None else after)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if start_poller and self._poller is None:
+                # The replay below is read after this point, so nothing committed
+                # in between is missed by both
+                self.last_seq = latest
+                self._poller = threading.Thread(target=self._poll, name='live-updates', daemon=True)
+                self._poller.start()
+
+        if after is None or after == latest:
+            return subscription, []
+        if after > latest or latest - after > REPLAY_SIZE:
+            return subscription, None
+        replay = read_events(after, REPLAY_SIZE)
+        # Committed ids have no gaps (SQLite has one writer), so a missing first id was pruned
+        if not replay or replay[0][0] != after + 1:
+            return subscription, None
+        return subscription, replay
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def wake(self):
+        """Look for new events now rather than at the next poll."""
+        self._wake.set()
+
+    def _poll(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+                after = self.last_seq
+            try:
+                with self.app.app_context():
+                    events = read_events(after, POLL_BATCH)
+            except Exception:
+                logger.exception("Reading live dashboard events failed")
+                continue
+            if events:
+                self._dispatch(events)
+            if len(events) == POLL_BATCH:
+                self._wake.set()
+
+    def _dispatch(self, events):
+        with self._lock:
+            for item in events:
+                for subscription in self._subscribers:
+                    if subscription.overflowed:
+                        continue
+                    try:
+                        subscription.queue.put_nowait(item)
+                    except queue.Full:
+                        subscription.overflowed = True
+            self.last_seq = events[-1][0]
+            self.published += len(events)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'published': self.published,
+                'last_seq': self.last_seq,
+            }
+
+
+def init_live_updates(app):
+    app.extensions['live_updates'] = EventBroker(app)
+
+
+def get_broker(app=None):
+    return (app or current_app).extensions['live_updates']
+
+
+def _pending(session):
+    pending = session.info.get(_PENDING_KEY)
+    if pending is None:
+        pending = session.info[_PENDING_KEY] = {'totals': dict.fromkeys(TOTAL_FIELDS, 0), 'days': {}}
+    return pending
+
+
+def queue_totals(session, **deltas):
+    """Add running-total deltas to the event sent when `session` commits."""
+    totals = _pending(session)['totals']
+    for field, delta in deltas.items():
+        totals[field] += delta
+
+
+def queue_day(session, day, periods, **deltas):
+    """Add chart deltas (sales, cogs, expenses) for `day` to the event sent on commit.
+
+    `periods` maps each chart granularity to the bucket label `day` falls
+    in, so the page can find the bar to update without date arithmetic.
+    """
+    days = _pending(session)['days']
+    entry = days.setdefault(day, {'periods': periods, 'sales': 0, 'cogs': 0, 'expenses': 0})
+    for field, delta in deltas.items():
+        entry[field] += delta
+
+
+def _event_kind(totals):
+    if totals['total_sales'] or totals['total_cogs']:
+        return 'sale'
+    if totals['total_expenses']:
+        return 'expense'
+    return 'stock'
+
+
+def build_event(pending):
+    """The JSON-ready event for one committed transaction's deltas, or None if nothing changed."""
+    totals = pending['totals']
+    days = [
+        {
+            'day': day.isoformat(),
+            'periods': entry['periods'],
+            'sales': round(entry['sales'], 2),
+            'cogs': round(entry['cogs'], 2),
+            'expenses': round(entry['expenses'], 2),
+        }
+        for day, entry in sorted(pending['days'].items())
+        if entry['sales'] or entry['cogs'] or entry['expenses']
+    ]
+    if not any(totals.values()) and not days:
+        return None
+    return {'kind': _event_kind(totals), 'totals': totals, 'days': days, 'at': datetime.utcnow().isoformat()}
+
+
+def format_sse(seq, data, event_name=None):
+    lines = [f'id: {seq}'] if seq is not None else []
+    if event_name:
+        lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_events(subscription, replay, keepalive=DEFAULT_KEEPALIVE_SECONDS):
+    """Yield the SSE body for one subscription: the replay, then live events as they arrive.
+
+    A comment line goes out every `keepalive` seconds so proxies keep the
+    connection open and a closed client is noticed. A listener that missed
+    events gets a `resync` event instead and the stream ends.
+    """
+    yield f'retry: {RETRY_MS}\n\n'
+    if replay is None:
+        yield format_sse(None, {}, 'resync')
+        return
+    for seq, data in replay:
+        subscription.seq = seq
+        yield format_sse(seq, data)
+    while not subscription.overflowed:
+        try:
+            seq, data = subscription.queue.get(timeout=keepalive)
+        except queue.Empty:
+            yield ': keepalive\n\n'
+            continue
+        if seq <= subscription.seq:
+            continue  # already sent in the replay, or included in the rendered page
+        subscription.seq = seq
+        yield format_sse(seq, data)
+    yield format_sse(None, {}, 'resync')
+
+
+# Deltas are collected while the transaction runs and written as one LiveEvent
+# just before it commits, so an open dashboard never shows a write that rolled
+# back and the event becomes visible to every worker together with the write.
+
+@event.listens_for(Session, 'before_commit')
+def _record_event(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is None:
+        return
+    data = build_event(pending)
+    if data is None:
+        return
+    seq = session.execute(insert(LiveEvent).values(data=json.dumps(data)).returning(LiveEvent.id)).scalar()
+    if seq % PRUNE_EVERY == 0:
+        session.execute(delete(LiveEvent).where(LiveEvent.id <= seq - EVENT_RETENTION))
+    session.info[_WRITTEN_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_local_streams(session):
+    # Other workers pick the event up at their next poll
+    if session.info.pop(_WRITTEN_KEY, False) and has_app_context():
+        broker = current_app.extensions.get('live_updates')
+        if broker is not None:
+            broker.wake()
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_uncommitted(session, transaction):
+    # On commit the deltas were already written; otherwise the work was rolled back or abandoned
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_WRITTEN_KEY, None)
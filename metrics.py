@@ -0,0 +1,189 @@
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULT_SLOW_QUERY_MS = 200
+PROFILE_STATS_LINES = 40
+
+
+class MetricsRegistry:
+    """Per-endpoint request latency and SQL totals, rendered in Prometheus text format.
+
+    Counters live in process memory, so each worker reports its own numbers;
+    Prometheus sums them across scrape targets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)           # (endpoint, method, status) -> count
+            self.latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+            self.latency_sum = defaultdict(float)      # (endpoint, method) -> seconds
+            self.latency_count = defaultdict(int)
+            self.sql_queries = defaultdict(int)        # endpoint -> queries
+            self.sql_seconds = defaultdict(float)      # endpoint -> seconds
+            self.slow_queries = 0
+
+    def observe_request(self, endpoint, method, status, elapsed, queries, sql_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            buckets = self.latency_buckets[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    buckets[i] += 1
+            self.latency_sum[key] += elapsed
+            self.latency_count[key] += 1
+            self.sql_queries[endpoint] += queries
+            self.sql_seconds[endpoint] += sql_seconds
+
+    def observe_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self, extra=()):
+        """Return the exposition text; `extra` adds (name, type, help, value) gauges."""
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP inventory_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE inventory_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'inventory_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP inventory_request_duration_seconds Time spent handling a request.',
+                '# TYPE inventory_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), buckets in sorted(self.latency_buckets.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'inventory_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                count = self.latency_count[(endpoint, method)]
+                lines.append(f'inventory_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'inventory_request_duration_seconds_sum{{{labels}}} {self.latency_sum[(endpoint, method)]:.6f}')
+                lines.append(f'inventory_request_duration_seconds_count{{{labels}}} {count}')
+
+            lines += [
+                '# HELP inventory_sql_queries_total SQL statements executed while handling requests.',
+                '# TYPE inventory_sql_queries_total counter',
+            ]
+            for endpoint, count in sorted(self.sql_queries.items()):
+                lines.append(f'inventory_sql_queries_total{{endpoint="{endpoint}"}} {count}')
+
+            lines += [
+                '# HELP inventory_sql_seconds_total Time spent in SQL while handling requests.',
+                '# TYPE inventory_sql_seconds_total counter',
+            ]
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'inventory_sql_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+
+            lines += [
+                '# HELP inventory_sql_slow_queries_total Statements slower than SLOW_QUERY_MS.',
+                '# TYPE inventory_sql_slow_queries_total counter',
+                f'inventory_sql_slow_queries_total {self.slow_queries}',
+            ]
+
+        for name, kind, help_text, value in extra:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+def _endpoint_label():
+    return request.endpoint or 'unmatched'
+
+
+def init_metrics(app):
+    """Time every request and SQL statement and keep the totals in app.extensions.
+
+    Each request gets `g.sql_queries` / `g.sql_seconds`, filled in by engine
+    events, and a Server-Timing header with the split between app and SQL
+    time. Statements slower than SLOW_QUERY_MS are logged with their SQL.
+    With PROFILE_REQUESTS enabled, an admin can add `?profile=1` to any URL to
+    get a cProfile report instead of the page. Streamed responses are timed
+    up to the point the body starts streaming.
+    """
+    app.config.setdefault('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS)
+    app.config.setdefault('PROFILE_REQUESTS', False)
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    slow_seconds = app.config['SLOW_QUERY_MS'] / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context():
+            g.sql_queries = g.get('sql_queries', 0) + 1
+            g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+        if elapsed >= slow_seconds:
+            registry.observe_slow_query()
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, ' '.join(statement.split())[:500])
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+        if (current_app.config['PROFILE_REQUESTS'] and request.args.get('profile')
+                and current_user.is_authenticated and current_user.is_admin()):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        registry.observe_request(
+            _endpoint_label(), request.method, response.status_code,
+            elapsed, g.sql_queries, g.sql_seconds,
+        )
+        response.headers['Server-Timing'] = (
+            f'app;dur={(elapsed - g.sql_seconds) * 1000:.1f}, '
+            f'sql;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_queries} queries"'
+        )
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            return _profile_response(profiler, elapsed)
+        return response
+
+
+def _profile_response(profiler, elapsed):
+    output = io.StringIO()
+    output.write(f"{request.method} {request.full_path}: {elapsed * 1000:.1f} ms, "
+                 f"{g.sql_queries} SQL queries in {g.sql_seconds * 1000:.1f} ms\n\n")
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_STATS_LINES)
+    return Response(output.getvalue(), mimetype='text/plain')
+
+
+def get_registry():
+    return current_app.extensions['metrics']
@@ -0,0 +1,103 @@
+from sqlalchemy import inspect, text
+
+from models import db, StockSnapshotRun
+from search import create_product_fts
+from stock_ledger import take_snapshot
+
+
+def _columns(table):
+    return {column['name'] for column in inspect(db.engine).get_columns(table)}
+
+
+def add_expense_timestamp():
+    # Expenses recorded before this column existed have no date; they are
+    # dated to the upgrade so that they still land in a rollup bucket.
+    if 'timestamp' not in _columns('expense'):
+        db.session.execute(text("ALTER TABLE expense ADD COLUMN timestamp DATETIME"))
+        db.session.execute(text("UPDATE expense SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL"))
+
+
+def add_sale_indexes():
+    # Every report filters or joins sales on these columns
+    for name, column in (
+        ('ix_sale_timestamp', 'timestamp'),
+        ('ix_sale_product_id', 'product_id'),
+        ('ix_sale_user_id', 'user_id'),
+    ):
+        db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON sale ({column})"))
+
+
+def add_sale_order_ref():
+    if 'order_ref' not in _columns('sale'):
+        db.session.execute(text("ALTER TABLE sale ADD COLUMN order_ref VARCHAR(32)"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_sale_order_ref ON sale (order_ref)"))
+
+
+def add_product_name_index():
+    # Bulk imports upsert by name
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_product_name ON product (name)"))
+
+
+def add_product_updated_at():
+    # Existing products count as changed at the upgrade, so the next API sync picks them all up
+    if 'updated_at' not in _columns('product'):
+        db.session.execute(text("ALTER TABLE product ADD COLUMN updated_at DATETIME"))
+        db.session.execute(text("UPDATE product SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_product_updated_at ON product (updated_at)"))
+
+
+def add_sale_sort_index():
+    # The sales listing pages by (timestamp, id) with NULL timestamps sorted
+    # first; the expression must match queries._sort_expression exactly
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sale_timestamp_sort "
+        "ON sale (coalesce(timestamp, '0001-01-01 00:00:00.000000'), id)"
+    ))
+
+
+def add_user_auth_version():
+    if 'auth_version' not in _columns('user'):
+        db.session.execute(text("ALTER TABLE user ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def add_export_job_lease():
+    columns = _columns('export_job')
+    if 'owner' not in columns:
+        db.session.execute(text("ALTER TABLE export_job ADD COLUMN owner VARCHAR(100)"))
+    if 'heartbeat_at' not in columns:
+        db.session.execute(text("ALTER TABLE export_job ADD COLUMN heartbeat_at DATETIME"))
+
+
+def add_stock_ledger():
+    # The ledger only knows about changes from now on, so the stock held at the
+    # upgrade becomes the first snapshot that point-in-time reports start from
+    if not db.session.query(StockSnapshotRun.id).first():
+        take_snapshot()
+
+
+def add_product_search_index():
+    create_product_fts()
+
+
+# Idempotent schema steps for databases created before the current models.
+# New steps go at the end; each must be safe to run against an up-to-date schema.
+MIGRATIONS = [
+    add_expense_timestamp,
+    add_sale_indexes,
+    add_product_search_index,
+    add_sale_order_ref,
+    add_product_name_index,
+    add_product_updated_at,
+    add_stock_ledger,
+    add_sale_sort_index,
+    add_user_auth_version,
+    add_export_job_lease,
+]
+
+
+def upgrade_db():
+    """Create missing tables and apply every pending schema step."""
+    db.create_all()
+    for migration in MIGRATIONS:
+        migration()
+    db.session.commit()
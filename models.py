@@ -2,7 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from reporting import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,6 +15,8 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='user')  # roles: admin, approver, user
     is_approved = db.Column(db.Boolean, default=False)
+    # Bumped whenever role or approval changes, so cached logins in every worker notice
+    auth_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     def is_admin(self):
         return self.role == 'admin'
 
@@ -21,10 +25,12 @@ class User(db.Model, UserMixin):
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
     cost_price = db.Column(db.Float, nullable=False)
+    # Set on every insert and update (Core statements included); drives API incremental sync
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Optional: Add relationship for reverse lookup
     sales = db.relationship('Sale', backref='product', lazy=True)
@@ -34,21 +40,127 @@ class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
     amount = db.Column(db.Float, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Sale(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     cost_price = db.Column(db.Float, nullable=False)  # <-- Add this line
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     customer_name = db.Column(db.String(100), nullable=True)
     payment_type = db.Column(db.String(50), nullable=True)  # e.g., Cash, Card, Mobile Money
     comments = db.Column(db.String(300), nullable=True)
     
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # Link to User
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)  # Link to User
+    order_ref = db.Column(db.String(32), index=True)  # Groups the lines of one checkout
     user = db.relationship('User', backref='sales')            # Optional: allows user.sales
 
 
+
+class ArchivedSale(db.Model):
+    # Sales moved out of `sale` once older than the archive cutoff (see
+    # archive.py). Same columns and ids; only date-ranged reports read it.
+    __tablename__ = 'sale_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product_id = db.Column(db.Integer, nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    cost_price = db.Column(db.Float, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    timestamp = db.Column(db.DateTime, index=True)
+    customer_name = db.Column(db.String(100), nullable=True)
+    payment_type = db.Column(db.String(50), nullable=True)
+    comments = db.Column(db.String(300), nullable=True)
+    user_id = db.Column(db.Integer, index=True)
+    order_ref = db.Column(db.String(32), index=True)
+
+class InventoryTotals(db.Model):
+    # Single-row table of running totals, updated in the same transaction as
+    # every write that changes them so the dashboard never has to aggregate.
+    id = db.Column(db.Integer, primary_key=True)
+    total_sales = db.Column(db.Float, nullable=False, default=0)
+    total_cogs = db.Column(db.Float, nullable=False, default=0)
+    total_expenses = db.Column(db.Float, nullable=False, default=0)
+    total_stock = db.Column(db.Integer, nullable=False, default=0)
+
+class LiveEvent(db.Model):
+    # Dashboard deltas of each committed write, inserted in the same transaction;
+    # the id is the live stream's event sequence, shared by every worker.
+    __table_args__ = {'sqlite_autoincrement': True}  # ids are never reused after pruning
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+
+class DailySalesRollup(db.Model):
+    # Per-day, per-product sales aggregates maintained alongside each sale
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    cogs = db.Column(db.Float, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyExpenseRollup(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    amount = db.Column(db.Float, nullable=False, default=0)
+
+class SalesVelocity(db.Model):
+    # Units sold per product over the trailing 7 and 30 complete days, slid
+    # forward from the daily rollups rather than recomputed from every sale
+    product_id = db.Column(db.Integer, primary_key=True)
+    units_7d = db.Column(db.Integer, nullable=False, default=0)
+    units_30d = db.Column(db.Integer, nullable=False, default=0)
+
+class SalesVelocityState(db.Model):
+    # Single row: the last complete day included in SalesVelocity
+    id = db.Column(db.Integer, primary_key=True)
+    through = db.Column(db.Date, nullable=False)
+
+class ExportJob(db.Model):
+    # Report exports queued to the background job runner
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)       # sales, products
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON-encoded export options
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # percent
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    file_path = db.Column(db.String(300), nullable=True)
+    download_name = db.Column(db.String(100), nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    error = db.Column(db.String(300), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    owner = db.Column(db.String(100), nullable=True)  # host:pid:boot of the process running it
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # lease, renewed while the owner is alive
+
+class TableVersion(db.Model):
+    # Write counter per table, bumped in the same transaction as every change
+    # to that table; cached pages and ETags are keyed on these numbers.
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class StockMovement(db.Model):
+    # Append-only ledger: one row per change to a product's quantity, written
+    # in the same transaction as the change itself.
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False, index=True)
+    change = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # sale, restock, create, edit, import, delete
+    ref = db.Column(db.String(64), nullable=True)  # e.g. the sale's order_ref
+    user_id = db.Column(db.Integer, nullable=True)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class StockSnapshotRun(db.Model):
+    # One row per snapshot; the snapshot covers every movement up to last_movement_id
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_movement_id = db.Column(db.Integer, nullable=False, default=0)
+
+class StockSnapshot(db.Model):
+    run_id = db.Column(db.Integer, db.ForeignKey('stock_snapshot_run.id'), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    cost_price = db.Column(db.Float, nullable=False)
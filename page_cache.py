@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, make_response, request
+from flask_login import current_user
+
+from table_versions import get_versions
+
+DEFAULT_PAGE_CACHE_SIZE = 256
+
+
+class PageCache:
+    """Thread-safe LRU of rendered pages keyed on the table versions they were built from.
+
+    Entries never need invalidating: a write bumps the version, so the next
+    request looks up a different key and stale pages simply age out.
+    """
+
+    def __init__(self, maxsize=DEFAULT_PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def configure(self, maxsize=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+page_cache = PageCache()
+
+
+def _page_etag(versions):
+    # The navbar differs for admins; everything else on these pages is shared
+    is_admin = current_user.is_authenticated and current_user.is_admin()
+    key = f"{request.endpoint}|{request.full_path}|{versions}|{is_admin}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def cached_page(*tables):
+    """Cache a view's GET response until one of `tables` is written to.
+
+    Costs one primary-key read of the table versions per request. A client
+    that sends back the ETag of an unchanged page gets a bodiless 304, and
+    any other client gets the cached HTML without the view running. Other
+    methods, and non-200 responses, pass straight through.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            etag = _page_etag(get_versions(*tables))
+            if etag in request.if_none_match:
+                page_cache.count_not_modified()
+                response = current_app.response_class(status=304)
+            else:
+                entry = page_cache.get(etag)
+                if entry is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    page_cache.put(etag, (response.get_data(), response.mimetype))
+                else:
+                    body, mimetype = entry
+                    response = current_app.response_class(body, mimetype=mimetype)
+
+            response.set_etag(etag)
+            # Browsers may keep the page but must revalidate it on every load
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,157 @@
+import io
+
+from sqlalchemy import func, select
+
+from models import db, DailyExpenseRollup, Product, User
+from queries import sales_source, filter_sales_by_date
+from rollups import period_bucket
+
+# Excel's sheet limit, less the header row
+EXCEL_MAX_ROWS = 1048575
+
+PNL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+MEASURE_COLUMNS = ['revenue', 'cogs', 'units', 'sales']
+
+
+def sales_breakdown(dimensions, start_date=None, end_date=None, granularity='month'):
+    """Revenue, COGS, units and sale count grouped by `dimensions`, as a DataFrame.
+
+    `dimensions` is any of 'period', 'product', 'payment_type' and 'cashier'.
+    The grouping is one SQL GROUP BY over the sales in range (hot and
+    archived as needed), with product and cashier names joined onto the
+    grouped rows afterwards, so only one row per group reaches Python.
+    Products are grouped by id, which comes back as a 'product_id' column
+    ahead of the 'product' name: two products can share a name.
+    """
+    import pandas as pd
+
+    source = sales_source(start_date)
+    sale = source.c
+    keys = {
+        'period': period_bucket(sale.timestamp, granularity),
+        'product': sale.product_id,
+        'payment_type': func.coalesce(sale.payment_type, 'Unspecified'),
+        'cashier': sale.user_id,
+    }
+    grouped = filter_sales_by_date(
+        select(
+            *[keys[name].label(name) for name in dimensions],
+            func.sum(sale.total_price).label('revenue'),
+            func.sum(sale.cost_price * sale.quantity).label('cogs'),
+            func.sum(sale.quantity).label('units'),
+            func.count().label('sales'),
+        ).where(sale.timestamp.isnot(None)),
+        start_date, end_date, source,
+    ).group_by(*[keys[name] for name in dimensions]).subquery()
+
+    columns, labels = [], []
+    for name in dimensions:
+        if name == 'product':
+            columns += [grouped.c.product, func.coalesce(Product.name, 'Unknown product')]
+            labels += ['product_id', 'product']
+        elif name == 'cashier':
+            columns.append(func.coalesce(User.username, 'N/A'))
+            labels.append(name)
+        else:
+            columns.append(grouped.c[name])
+            labels.append(name)
+    query = select(*columns, *[grouped.c[name] for name in MEASURE_COLUMNS])
+    if 'product' in dimensions:
+        query = query.outerjoin(Product, grouped.c.product == Product.id)
+    if 'cashier' in dimensions:
+        query = query.outerjoin(User, grouped.c.cashier == User.id)
+    rows = db.session.execute(query.select_from(grouped)).all()
+    return pd.DataFrame.from_records(rows, columns=labels + MEASURE_COLUMNS)
+
+
+def expenses_by_period(start_date=None, end_date=None, granularity='month'):
+    """Expense totals per period, read from the daily expense rollup."""
+    import pandas as pd
+
+    period = period_bucket(DailyExpenseRollup.day, granularity)
+    query = select(period.label('period'), func.sum(DailyExpenseRollup.amount).label('expenses'))
+    if start_date:
+        query = query.where(DailyExpenseRollup.day >= start_date.date())
+    if end_date:
+        query = query.where(DailyExpenseRollup.day < end_date.date())
+    rows = db.session.execute(query.group_by(period)).all()
+    return pd.DataFrame.from_records(rows, columns=['period', 'expenses']).set_index('period')['expenses']
+
+
+def _with_margin(frame):
+    frame = frame.copy()
+    frame['margin'] = frame['revenue'] - frame['cogs']
+    # A zero-revenue group has no meaningful margin %, leave it blank
+    frame['margin_pct'] = (frame['margin'] / frame['revenue'].where(frame['revenue'] != 0) * 100).round(2)
+    return frame
+
+
+def build_pnl(start_date=None, end_date=None, granularity='month', detail=False):
+    """Return {sheet name: DataFrame} for the P&L workbook.
+
+    Sheets: the period P&L (with expenses and net profit), margin by product,
+    by cashier and by payment type, revenue per product per period, and with
+    `detail` the full product x period x payment type x cashier breakdown.
+    """
+    # Two narrow groupings cover every summary sheet; each has few rows even
+    # over millions of sales, unlike the full four-way breakdown
+    by_period_product = sales_breakdown(('period', 'product'), start_date, end_date, granularity)
+    by_period_till = sales_breakdown(('period', 'payment_type', 'cashier'), start_date, end_date, granularity)
+
+    by_period = by_period_product.groupby('period')[MEASURE_COLUMNS].sum()
+    expenses = expenses_by_period(start_date, end_date, granularity)
+    pnl = _with_margin(by_period.join(expenses, how='outer').fillna(0))
+    pnl = pnl.rename(columns={'margin': 'gross_profit', 'margin_pct': 'gross_margin_pct'})
+    pnl['net_profit'] = pnl['gross_profit'] - pnl['expenses']
+    pnl.loc['Total'] = pnl.sum(numeric_only=True)
+    pnl.loc['Total', 'gross_margin_pct'] = (
+        round(pnl.loc['Total', 'gross_profit'] / pnl.loc['Total', 'revenue'] * 100, 2)
+        if pnl.loc['Total', 'revenue'] else None
+    )
+
+    by_product = _with_margin(
+        by_period_product.groupby(['product_id', 'product'])[MEASURE_COLUMNS].sum()
+    ).sort_values('revenue', ascending=False)
+
+    by_cashier = _with_margin(
+        by_period_till.groupby('cashier')[MEASURE_COLUMNS].sum()
+    ).sort_values('revenue', ascending=False)
+
+    by_payment = _with_margin(
+        by_period_till.groupby('payment_type')[MEASURE_COLUMNS].sum()
+    ).sort_values('revenue', ascending=False)
+
+    payment_by_period = by_period_till.pivot_table(
+        index='period', columns='payment_type', values='revenue', aggfunc='sum', fill_value=0,
+    )
+
+    product_by_period = by_period_product.pivot_table(
+        index=['product_id', 'product'], columns='period', values='revenue', aggfunc='sum', fill_value=0,
+    )
+    if not product_by_period.empty:
+        product_by_period = product_by_period.loc[product_by_period.sum(axis=1).sort_values(ascending=False).index]
+
+    sheets = {
+        'P&L': pnl,
+        'By product': by_product,
+        'By cashier': by_cashier,
+        'By payment type': by_payment,
+        'Payment type x period': payment_by_period,
+        'Product x period': product_by_period,
+    }
+    if detail:
+        detail_rows = sales_breakdown(('period', 'product', 'payment_type', 'cashier'), start_date, end_date, granularity)
+        sheets['Detail'] = _with_margin(detail_rows).head(EXCEL_MAX_ROWS)
+    return sheets
+
+
+def write_pnl_workbook(sheets):
+    """Write the P&L sheets to an in-memory .xlsx and return its bytes."""
+    import pandas as pd
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=name != 'Detail')
+    return output.getvalue()
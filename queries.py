@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, func, literal_column, or_, select, union_all
+
+from models import db, ArchivedSale, Product, Sale, User
+
+
+def archive_boundary():
+    """Timestamp of the newest archived sale, or None if nothing is archived."""
+    return db.session.query(func.max(ArchivedSale.timestamp)).scalar()
+
+
+def sales_source(start_date=None):
+    """The table to read sales from when reporting on [start_date, ...).
+
+    Ranges that start after the newest archived sale only need the hot `sale`
+    table. Older (or open-ended) ranges get `sale` and `sale_archive` as one
+    UNION ALL with the same column names, so callers treat both alike.
+    """
+    boundary = archive_boundary()
+    if boundary is None or (start_date is not None and start_date > boundary):
+        return Sale.__table__
+    names = [column.name for column in Sale.__table__.c]
+    return union_all(
+        select(*[Sale.__table__.c[name] for name in names]),
+        select(*[ArchivedSale.__table__.c[name] for name in names]),
+    ).subquery('all_sales')
+
+
+def sales_projection(source=None):
+    """Sales joined to their product and user, selecting only the listed columns.
+
+    Every sales listing, report and export builds on this query so that each
+    row arrives with its product name and username in a single SELECT instead
+    of lazy-loading `Product` and `User` per sale. `source` comes from
+    sales_source(); by default only the hot table is read.
+    """
+    sale = (source if source is not None else Sale.__table__).c
+    return (
+        db.session.query(
+            sale.id.label('id'),
+            Product.name.label('product_name'),
+            sale.quantity.label('quantity'),
+            sale.cost_price.label('cost_price'),
+            sale.unit_price.label('unit_price'),
+            sale.total_price.label('total_price'),
+            sale.customer_name.label('customer_name'),
+            sale.payment_type.label('payment_type'),
+            sale.comments.label('comments'),
+            User.username.label('username'),
+            User.full_name.label('user_full_name'),
+            sale.timestamp.label('timestamp'),
+        )
+        .select_from(source if source is not None else Sale.__table__)
+        .outerjoin(Product, sale.product_id == Product.id)
+        .outerjoin(User, sale.user_id == User.id)
+    )
+
+
+def filter_sales_by_date(query, start_date=None, end_date=None, source=None):
+    """Restrict a sales query (over `source`, default the hot table) to [start_date, end_date)."""
+    timestamp = (source if source is not None else Sale.__table__).c.timestamp
+    if start_date:
+        query = query.filter(timestamp >= start_date)
+    if end_date:
+        query = query.filter(timestamp < end_date)
+    return query
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+Page = namedtuple('Page', ['items', 'next_cursor', 'prev_cursor'])
+
+# Nullable DateTime sort keys order NULL as this value, so a cursor never
+# carries a null. Written as SQLite stores it, to match ix_sale_timestamp_sort.
+NULL_SORT_TIMESTAMP = datetime(1, 1, 1)
+_NULL_SORT_SQL = "'0001-01-01 00:00:00.000000'"
+
+
+def get_page_size(value):
+    """Parse a `per_page` query parameter, clamped to [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """Turn a cursor back into key values; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if not isinstance(payload, list) or len(payload) != len(keys):
+        raise ValueError('Invalid cursor')
+
+    values = []
+    for key, value in zip(keys, payload):
+        if isinstance(key.type, DateTime):
+            if not isinstance(value, str):
+                raise ValueError('Invalid cursor')
+            value = datetime.fromisoformat(value)
+        elif value is None or isinstance(value, bool) or not isinstance(value, _cursor_type(key)):
+            raise ValueError('Invalid cursor')
+        values.append(value)
+    return values
+
+
+def _cursor_type(key):
+    try:
+        python_type = key.type.python_type
+    except NotImplementedError:
+        return object
+    # JSON has one number type
+    return (int, float) if python_type is float else python_type
+
+
+def _sort_expression(key):
+    """`key` as ordered and compared by keyset_page: nullable timestamps with NULL made the minimum."""
+    if isinstance(key.type, DateTime) and getattr(key, 'nullable', False):
+        return func.coalesce(key, literal_column(_NULL_SORT_SQL, DateTime), type_=DateTime)
+    return key
+
+
+def _sort_value(key, value):
+    if value is None and isinstance(key.type, DateTime):
+        return NULL_SORT_TIMESTAMP
+    return value
+
+
+def _seek(keys, values, greater):
+    """Lexicographic (k1, k2, ...) > (v1, v2, ...) (or < when greater is False)."""
+    key, value = keys[0], values[0]
+    head = key > value if greater else key < value
+    if len(keys) == 1:
+        return head
+    return or_(head, and_(key == value, _seek(keys[1:], values[1:], greater)))
+
+
+def keyset_page(query, keys, after=None, before=None, page_size=DEFAULT_PAGE_SIZE, descending=False):
+    """Return one page of `query` ordered by `keys` using keyset pagination.
+
+    `keys` must uniquely order the rows (end with a primary key) and each key
+    must also be selected under the same name, so the cursor can be read off
+    the first and last rows. `after` fetches the page following a cursor,
+    `before` the page preceding it. Unlike OFFSET, every page is an index seek,
+    so latency does not grow with how deep the user has paged. A nullable
+    DateTime key sorts NULL as NULL_SORT_TIMESTAMP, so rows without a
+    timestamp page like any other.
+    """
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    sort_keys = [_sort_expression(k) for k in keys]
+
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        # Rows after the cursor in display order are smaller keys when descending
+        query = query.filter(_seek(sort_keys, values, greater=(descending == backwards)))
+
+    reverse_scan = descending != backwards
+    query = query.order_by(*[k.desc() if reverse_scan else k.asc() for k in sort_keys])
+    rows = query.limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def row_cursor(row):
+        return encode_cursor([_sort_value(k, getattr(row, k.key)) for k in keys])
+
+    if not rows:
+        return Page([], None, None)
+
+    if backwards:
+        next_cursor = row_cursor(rows[-1])
+        prev_cursor = row_cursor(rows[0]) if has_more else None
+    else:
+        next_cursor = row_cursor(rows[-1]) if has_more else None
+        prev_cursor = row_cursor(rows[0]) if cursor else None
+    return Page(rows, next_cursor, prev_cursor)
@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.expression import SelectBase
+from sqlalchemy.engine import make_url
+
+REPORTING_BIND = 'reporting'
+DEFAULT_REPORTING_POOL_SIZE = 4
+# Reports queue for a reporting connection rather than fail when all are busy
+DEFAULT_REPORTING_POOL_TIMEOUT = 120
+
+# session.info key: how many reporting_reads() blocks are open on the session
+_REPORTING_DEPTH = 'reporting_depth'
+# WSGI environ key set by reporting_view for the whole request
+_REPORTING_ENVIRON_KEY = 'inventory.reporting'
+
+
+def reporting_url(database_url):
+    """A read-only URL for the same SQLite file, or None if one can't be derived.
+
+    SQLite opens `mode=ro` URIs read-only at the file level, so a report can
+    never take the write lock a checkout needs. Other databases have no such
+    switch; point REPORTING_DATABASE_URI at a replica instead. A relative
+    path stays relative, so Flask-SQLAlchemy resolves both URLs against the
+    instance folder alike.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    if url.query.get('uri'):
+        return None  # already a URI; leave its options alone
+    return f"sqlite:///file:{url.database}?mode=ro&uri=true"
+
+
+def configure_reporting_bind(app):
+    """Add the `reporting` engine to SQLALCHEMY_BINDS; call before db.init_app().
+
+    REPORTING_DATABASE_URI picks the database (default: the main SQLite file,
+    read-only), REPORTING_POOL_SIZE sizes its pool separately from the
+    checkout pool. Setting REPORTING_DATABASE_URI to '' turns the split off
+    and reports read through the main engine as before.
+    """
+    url = app.config.get('REPORTING_DATABASE_URI')
+    if url is None:
+        url = reporting_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if not url:
+        return
+
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[REPORTING_BIND] = {
+        'url': url,
+        'pool_size': app.config.get('REPORTING_POOL_SIZE', DEFAULT_REPORTING_POOL_SIZE),
+        'max_overflow': 0,
+        'pool_timeout': app.config.get('REPORTING_POOL_TIMEOUT', DEFAULT_REPORTING_POOL_TIMEOUT),
+    }
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the reporting engine for reporting_reads() and reporting_view.
+
+    Only SELECT statements outside a flush are rerouted. Writes, flushes and
+    bare session.connection() calls (the table-version and live-update hooks)
+    stay on the main engine, so a report that also records something, such
+    as an export job's progress, still writes where the till does. Outside a
+    reporting block, or with no reporting engine configured, this is the
+    stock Flask-SQLAlchemy session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(clause, SelectBase) and not self._flushing and _reporting_active(self):
+            engine = self._db.engines.get(REPORTING_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _reporting_active(session):
+    if session.info.get(_REPORTING_DEPTH):
+        return True
+    return has_request_context() and request.environ.get(_REPORTING_ENVIRON_KEY, False)
+
+
+def _session():
+    return current_app.extensions['sqlalchemy'].session()
+
+
+@contextmanager
+def reporting_reads():
+    """Run the enclosed queries on the read-only reporting connection pool."""
+    session = _session()
+    session.info[_REPORTING_DEPTH] = session.info.get(_REPORTING_DEPTH, 0) + 1
+    try:
+        yield session
+    finally:
+        session.info[_REPORTING_DEPTH] -= 1
+
+
+def reporting_view(f):
+    """Route every read a view makes, including a streamed body, to the reporting pool.
+
+    The mark goes on the request rather than the session: a body streamed
+    with stream_with_context runs after the view's app context (and its
+    session) is gone, but still inside the same request.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        request.environ[_REPORTING_ENVIRON_KEY] = True
+        return f(*args, **kwargs)
+    return decorated_function
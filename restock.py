@@ -0,0 +1,135 @@
+from sqlalchemy import bindparam, func, update
+
+from importer import parse_number, read_rows
+from models import db, Product
+from stock_ledger import record_movements
+from totals import adjust_totals
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+class RestockResult:
+    def __init__(self):
+        self.changes = []
+        self.errors = []
+
+    @property
+    def units_added(self):
+        return sum(change['added'] for change in self.changes)
+
+
+def _number(value, cast, field, required):
+    number = parse_number(value, cast, field, required)
+    if number is None:
+        return None
+    if number < 0 or (required and number == 0):
+        raise ValueError(f"{field.capitalize()} must be positive")
+    return number
+
+
+def parse_line(record):
+    """Validate one manifest line: a product (id or name), quantity to add and optional new price."""
+    product_id = record.get('id')
+    name = str(record.get('name') or '').strip()
+    if product_id not in (None, ''):
+        product_id = parse_number(product_id, int, 'product id')
+    else:
+        product_id = None
+        if not name:
+            raise ValueError("Missing product name or id")
+    return {
+        'id': product_id,
+        'name': name,
+        'quantity': _number(record.get('quantity'), int, 'quantity', required=True),
+        'price': _number(record.get('price'), float, 'price', required=False),
+    }
+
+
+def read_manifest(stream, filename):
+    """Parse an uploaded delivery manifest into (row_number, record) pairs."""
+    return read_rows(stream, filename)
+
+
+def read_form_lines(form):
+    names = form.getlist('name')
+    quantities = form.getlist('quantity')
+    prices = form.getlist('price')
+    for row_number, (name, quantity, price) in enumerate(zip(names, quantities, prices), start=1):
+        if not name.strip() and not quantity.strip():
+            continue  # blank row left in the form
+        yield row_number, {'name': name, 'quantity': quantity, 'price': price}
+
+
+def _lookup(column, values):
+    """Fetch (id, name, quantity, price) for products matching `values`, in bounded IN lists."""
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        rows.extend(
+            db.session.query(Product.id, Product.name, Product.quantity, Product.price)
+            .filter(column.in_(chunk))
+            .all()
+        )
+    return rows
+
+
+def apply_restock(records):
+    """Apply every valid manifest line in one batched transaction.
+
+    Lines for the same product are merged (quantities add up, the last price
+    wins). Returns a RestockResult with a per-product summary and per-line
+    errors; invalid lines are skipped without failing the delivery.
+    """
+    result = RestockResult()
+    lines = []
+    for row_number, record in records:
+        try:
+            lines.append((row_number, parse_line(record)))
+        except ValueError as exc:
+            result.errors.append((row_number, str(exc)))
+
+    by_id = {row.id: row for row in _lookup(Product.id, {line['id'] for _, line in lines if line['id']})}
+    by_name = {}
+    for row in _lookup(Product.name, {line['name'] for _, line in lines if not line['id']}):
+        by_name.setdefault(row.name, row)
+
+    merged = {}
+    for row_number, line in lines:
+        product = by_id.get(line['id']) if line['id'] else by_name.get(line['name'])
+        if product is None:
+            result.errors.append((row_number, f"Unknown product '{line['id'] or line['name']}'"))
+            continue
+        added, price = merged.get(product.id, (0, None))
+        merged[product.id] = (added + line['quantity'], line['price'] if line['price'] is not None else price)
+        by_id[product.id] = product
+
+    if not merged:
+        return result
+
+    table = Product.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam('pid'))
+        .values(
+            quantity=table.c.quantity + bindparam('added'),
+            price=func.coalesce(bindparam('new_price'), table.c.price),
+        ),
+        [{'pid': pid, 'added': added, 'new_price': price} for pid, (added, price) in merged.items()],
+    )
+    record_movements([{'product_id': pid, 'change': added, 'reason': 'restock'} for pid, (added, _) in merged.items()])
+    adjust_totals(stock=sum(added for added, _ in merged.values()))
+    db.session.commit()
+
+    for pid, (added, price) in merged.items():
+        product = by_id[pid]
+        result.changes.append({
+            'id': pid,
+            'name': product.name,
+            'added': added,
+            'old_quantity': product.quantity,
+            'new_quantity': product.quantity + added,
+            'old_price': product.price,
+            'new_price': price if price is not None else product.price,
+        })
+    return result
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, cast, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from live_updates import queue_day
+from models import db, Expense, DailySalesRollup, DailyExpenseRollup
+from queries import sales_source
+
+GRANULARITIES = {
+    'day': '%Y-%m-%d',
+    'week': '%G-W%V',  # ISO 8601 weeks, so a week never splits at New Year
+    'month': '%Y-%m',
+}
+
+
+def _day(timestamp):
+    return (timestamp or datetime.utcnow()).date()
+
+
+def period_labels(day):
+    """The chart bucket `day` falls in for each granularity, as period_series labels them."""
+    return {name: day.strftime(bucket_format) for name, bucket_format in GRANULARITIES.items()}
+
+
+def period_bucket(column, granularity):
+    """SQL for the label of the period a date or timestamp column falls in, as period_labels() gives it."""
+    if granularity == 'week':
+        # SQLite only has %G/%V from 3.46: an ISO week belongs to the year its Thursday is in
+        thursday = func.date(column, 'weekday 0', '-3 days')
+        week = (cast(func.strftime('%j', thursday), Integer) - 1) // 7 + 1
+        return func.printf('%s-W%02d', func.strftime('%Y', thursday), week)
+    return func.strftime(GRANULARITIES[granularity], column)
+
+
+def add_sale_rollup(timestamp, product_id, revenue, cogs, units):
+    """Add a sale to its day's rollup in the current transaction."""
+    day = _day(timestamp)
+    queue_day(db.session, day, period_labels(day), sales=revenue, cogs=cogs)
+    stmt = sqlite_insert(DailySalesRollup).values(
+        day=day, product_id=product_id, revenue=revenue, cogs=cogs, units=units,
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[DailySalesRollup.day, DailySalesRollup.product_id],
+        set_={
+            'revenue': DailySalesRollup.revenue + stmt.excluded.revenue,
+            'cogs': DailySalesRollup.cogs + stmt.excluded.cogs,
+            'units': DailySalesRollup.units + stmt.excluded.units,
+        },
+    ))
+
+
+def add_expense_rollup(timestamp, amount):
+    """Add (or with a negative amount, remove) an expense from its day's rollup."""
+    if not amount:
+        return
+    day = _day(timestamp)
+    queue_day(db.session, day, period_labels(day), expenses=amount)
+    stmt = sqlite_insert(DailyExpenseRollup).values(day=day, amount=amount)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[DailyExpenseRollup.day],
+        set_={'amount': DailyExpenseRollup.amount + stmt.excluded.amount},
+    ))
+
+
+def backfill_rollups():
+    """Rebuild both rollup tables from the raw sales (hot and archived) and expenses."""
+    db.session.execute(delete(DailySalesRollup))
+    db.session.execute(delete(DailyExpenseRollup))
+
+    sale = sales_source().c
+    sale_day = func.date(sale.timestamp)
+    db.session.execute(insert(DailySalesRollup).from_select(
+        ['day', 'product_id', 'revenue', 'cogs', 'units'],
+        select(
+            sale_day,
+            sale.product_id,
+            func.sum(sale.total_price),
+            func.sum(sale.cost_price * sale.quantity),
+            func.sum(sale.quantity),
+        ).where(sale.timestamp.isnot(None)).group_by(sale_day, sale.product_id),
+    ))
+
+    expense_day = func.date(Expense.timestamp)
+    db.session.execute(insert(DailyExpenseRollup).from_select(
+        ['day', 'amount'],
+        select(expense_day, func.sum(Expense.amount))
+        .where(Expense.timestamp.isnot(None)).group_by(expense_day),
+    ))
+    db.session.commit()
+
+
+def default_period():
+    """The last twelve months, ending today (UTC, like the rollup days)."""
+    today = datetime.utcnow().date()
+    return today - timedelta(days=364), today
+
+
+def period_series(start_date, end_date, granularity='month'):
+    """Revenue, COGS, expenses and profit per period, read only from the rollups.
+
+    `start_date` and `end_date` are inclusive dates. Returns parallel lists
+    keyed by 'labels', 'sales', 'cogs', 'expenses' and 'profit'.
+    """
+    if granularity not in GRANULARITIES:
+        granularity = 'month'
+
+    sales_bucket = period_bucket(DailySalesRollup.day, granularity)
+    sales_rows = (
+        db.session.query(sales_bucket, func.sum(DailySalesRollup.revenue), func.sum(DailySalesRollup.cogs))
+        .filter(DailySalesRollup.day >= start_date, DailySalesRollup.day <= end_date)
+        .group_by(sales_bucket)
+        .all()
+    )
+
+    expense_bucket = period_bucket(DailyExpenseRollup.day, granularity)
+    expense_rows = (
+        db.session.query(expense_bucket, func.sum(DailyExpenseRollup.amount))
+        .filter(DailyExpenseRollup.day >= start_date, DailyExpenseRollup.day <= end_date)
+        .group_by(expense_bucket)
+        .all()
+    )
+
+    sales = {label: (revenue or 0, cogs or 0) for label, revenue, cogs in sales_rows}
+    expenses = {label: amount or 0 for label, amount in expense_rows}
+
+    series = {'labels': [], 'sales': [], 'cogs': [], 'expenses': [], 'profit': []}
+    for label in sorted(set(sales) | set(expenses)):
+        revenue, cogs = sales.get(label, (0, 0))
+        spent = expenses.get(label, 0)
+        series['labels'].append(label)
+        series['sales'].append(round(revenue, 2))
+        series['cogs'].append(round(cogs, 2))
+        series['expenses'].append(round(spent, 2))
+        series['profit'].append(round(revenue - cogs - spent, 2))
+    return series
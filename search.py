@@ -0,0 +1,73 @@
+import re
+
+from sqlalchemy import column, text
+
+from models import db, Product
+
+FTS_TABLE = 'product_fts'
+
+# External-content FTS5 index over product.name; the triggers keep it in step
+# with every insert, update and delete on product, including bulk statements.
+FTS_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, content='product', content_rowid='id', tokenize='unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name ON product BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+]
+
+_fts_engines = set()
+
+
+def create_product_fts():
+    """Create the product-name FTS5 index and its sync triggers.
+
+    A freshly created index is populated from the existing products.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    existed = fts_available()
+    for statement in FTS_SCHEMA:
+        db.session.execute(text(statement))
+    if not existed:
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def fts_available():
+    engine = db.engine
+    if engine.url in _fts_engines:
+        return True
+    if engine.dialect.name != 'sqlite':
+        return False
+    found = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE},
+    ).first()
+    if found:
+        _fts_engines.add(engine.url)
+    return bool(found)
+
+
+def fts_match_expression(search):
+    """Turn free text into an FTS5 query that prefix-matches every word."""
+    words = re.findall(r'\w+', search)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def product_name_filter(search, product_id_column=Product.id):
+    """Filter clause matching products whose name matches `search`.
+
+    Uses the FTS5 index when it exists (word-prefix matching) and falls back
+    to a substring ILIKE scan otherwise.
+    """
+    match = fts_match_expression(search)
+    if match and fts_available():
+        matching_ids = text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=match).columns(column('rowid'))
+        return product_id_column.in_(matching_ids)
+    return Product.name.ilike(f"%{search}%")
@@ -0,0 +1,41 @@
+import sqlite3
+
+from sqlalchemy import event
+
+from models import db
+from reporting import REPORTING_BIND
+
+# WAL lets readers run alongside the single writer, busy_timeout makes writers
+# queue for the lock instead of failing with "database is locked", and
+# synchronous=NORMAL is durable under WAL while skipping an fsync per commit.
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 15000,
+    'synchronous': 'NORMAL',
+}
+
+
+def _pragma_setter(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+
+def configure_sqlite(app):
+    """Apply SQLITE_PRAGMAS (merged over the defaults) to every new SQLite connection."""
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {})}
+    # Read-only connections can't change the journal mode (the writer has
+    # already set WAL on the file); query_only is a second guard on writes.
+    reporting_pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+    reporting_pragmas['query_only'] = 'ON'
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                setter = _pragma_setter(reporting_pragmas if bind_key == REPORTING_BIND else pragmas)
+                event.listen(engine, 'connect', setter)
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from sqlalchemy import Float, cast, func, insert, literal, null, select, union_all, update
+
+from models import db, Product, StockMovement, StockSnapshot, StockSnapshotRun
+
+STOCK_EXPORT_HEADERS = ['Product ID', 'Product', 'Quantity', 'Cost Price', 'Value']
+
+
+def record_movements(rows, timestamp=None):
+    """Append ledger rows ({product_id, change, reason[, ref, user_id]}) to the current transaction.
+
+    Call this next to the write that changes Product.quantity, before the
+    commit, so the ledger and the stock level can never disagree.
+    """
+    timestamp = timestamp or datetime.utcnow()
+    rows = [
+        {'ref': None, 'user_id': None, **row, 'timestamp': timestamp}
+        for row in rows if row['change']
+    ]
+    if rows:
+        db.session.execute(insert(StockMovement), rows)
+
+
+def record_movement(product_id, change, reason, ref=None, user_id=None, timestamp=None):
+    record_movements([{
+        'product_id': product_id, 'change': change, 'reason': reason, 'ref': ref, 'user_id': user_id,
+    }], timestamp)
+
+
+def take_snapshot():
+    """Copy every product's quantity and cost price into a new snapshot run and commit.
+
+    The run is inserted first so the write lock is held while the quantities
+    and the last movement id are read: no checkout can land between the two,
+    which would otherwise count its movement twice.
+    """
+    run_id = db.session.execute(
+        insert(StockSnapshotRun).values(taken_at=datetime.utcnow(), last_movement_id=0)
+        .returning(StockSnapshotRun.id)
+    ).scalar_one()
+    db.session.execute(insert(StockSnapshot).from_select(
+        ['run_id', 'product_id', 'quantity', 'cost_price'],
+        select(literal(run_id), Product.id, Product.quantity, Product.cost_price),
+    ))
+    db.session.execute(
+        update(StockSnapshotRun)
+        .where(StockSnapshotRun.id == run_id)
+        .values(last_movement_id=select(func.coalesce(func.max(StockMovement.id), 0)).scalar_subquery())
+    )
+    db.session.commit()
+    return run_id
+
+
+def latest_snapshot_before(at):
+    return (
+        StockSnapshotRun.query
+        .filter(StockSnapshotRun.taken_at <= at)
+        .order_by(StockSnapshotRun.taken_at.desc(), StockSnapshotRun.id.desc())
+        .first()
+    )
+
+
+def stock_as_of(at):
+    """Per-product (product_id, name, quantity, cost_price) held at `at`, ordered by name.
+
+    Reads the newest snapshot taken at or before `at` plus the movements
+    recorded after it and before `at`, so the cost is one snapshot and a
+    short tail of the ledger rather than the whole history. Products at zero
+    are left out. Raises ValueError if `at` predates the first snapshot,
+    since the ledger says nothing about stock before it.
+    """
+    run = latest_snapshot_before(at)
+    if run is None:
+        first = db.session.query(func.min(StockSnapshotRun.taken_at)).scalar()
+        if first is None:
+            raise ValueError("No stock snapshot has been taken yet")
+        raise ValueError(f"Stock history starts at {first:%Y-%m-%d %H:%M}")
+
+    baseline = select(
+        StockSnapshot.product_id, StockSnapshot.quantity.label('change'), StockSnapshot.cost_price,
+    ).where(StockSnapshot.run_id == run.id)
+    tail = select(
+        StockMovement.product_id, StockMovement.change, cast(null(), Float).label('cost_price'),
+    ).where(StockMovement.id > run.last_movement_id, StockMovement.timestamp < at)
+    combined = union_all(baseline, tail).subquery()
+
+    grouped = (
+        select(
+            combined.c.product_id,
+            func.sum(combined.c.change).label('quantity'),
+            func.max(combined.c.cost_price).label('cost_price'),
+        )
+        .group_by(combined.c.product_id)
+        .subquery()
+    )
+    # Products created after the snapshot take their current cost price
+    query = (
+        select(
+            grouped.c.product_id,
+            func.coalesce(Product.name, 'Deleted product').label('name'),
+            grouped.c.quantity,
+            func.coalesce(grouped.c.cost_price, Product.cost_price, 0).label('cost_price'),
+        )
+        .select_from(grouped)
+        .outerjoin(Product, grouped.c.product_id == Product.id)
+        .where(grouped.c.quantity != 0)
+        .order_by('name', grouped.c.product_id)
+    )
+    return db.session.execute(query).all()
+
+
+def stock_export_rows(rows):
+    for row in rows:
+        yield [row.product_id, row.name, row.quantity, row.cost_price, round(row.quantity * row.cost_price, 2)]
@@ -0,0 +1,51 @@
+from itertools import chain
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, Product, Sale, Expense, TableVersion
+
+VERSIONED_TABLES = frozenset(model.__table__.name for model in (Product, Sale, Expense))
+
+
+def bump_versions(connection, tables):
+    """Increment the version of each table in `tables` on `connection`'s transaction."""
+    stmt = sqlite_insert(TableVersion).values([{'table_name': name, 'version': 1} for name in sorted(tables)])
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={'version': TableVersion.version + 1},
+    ))
+
+
+def get_versions(*tables):
+    """Current version of each named table, in the order given (0 if never written)."""
+    rows = db.session.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(tables))
+    ).all()
+    versions = dict(rows)
+    return tuple(versions.get(name, 0) for name in tables)
+
+
+# Writes reach the versioned tables two ways: ORM unit-of-work flushes and
+# statements run through session.execute() (bulk inserts, conditional and
+# executemany UPDATEs). Both are caught here, so no call site has to remember.
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed_tables(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if obj.__table__.name in VERSIONED_TABLES
+    }
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_executed_table(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in VERSIONED_TABLES:
+        bump_versions(orm_execute_state.session.connection(), {table.name})
@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from migrations import upgrade_db
+from models import db, User
+
+PASSWORD = 'test-password'
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'EXPORT_JOB_DIR': str(tmp_path / 'exports'),
+    })
+    with app.app_context():
+        upgrade_db()
+        db.session.add(User(username='admin', full_name='Admin', email='admin@example.com',
+                            password=generate_password_hash(PASSWORD), role='admin', is_approved=True))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+@contextmanager
+def count_statements(app):
+    """Count the SQL statements sent on any of the app's engines while the block runs."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,24 @@
+"""Incremental sync through /api/v1 must not skip writes that commit late."""
+from datetime import datetime, timedelta
+
+from models import db, Product
+
+
+def test_sync_returns_write_stamped_before_previous_server_time(app, client):
+    first = client.get('/api/v1/products').get_json()
+    assert first['items'] == []
+
+    # Stamped a few seconds before that sync ran, but committed only now
+    with app.app_context():
+        db.session.add(Product(name='Late', quantity=1, price=1, cost_price=1,
+                               updated_at=datetime.utcnow() - timedelta(seconds=5)))
+        db.session.commit()
+
+    second = client.get('/api/v1/products', query_string={'since': first['server_time']}).get_json()
+    assert [item['name'] for item in second['items']] == ['Late']
+
+
+def test_server_time_is_set_back_by_the_overlap(app, client):
+    app.config['API_SYNC_OVERLAP_SECONDS'] = 600
+    server_time = datetime.fromisoformat(client.get('/api/v1/stock').get_json()['server_time'])
+    assert datetime.utcnow() - server_time >= timedelta(seconds=600)
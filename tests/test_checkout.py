@@ -0,0 +1,35 @@
+"""Sales with unusable unit prices are refused with a 400 and change nothing."""
+import pytest
+
+from models import db, Product, Sale
+from totals import get_totals_and_seq
+
+
+@pytest.mark.parametrize('unit_price', ['nan', 'inf', '-inf', '1e400', '-5', 'abc', ''])
+def test_bad_unit_price_is_rejected(app, client, unit_price):
+    with app.app_context():
+        product = Product(name='Item', quantity=10, price=10, cost_price=6)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+        totals, _ = get_totals_and_seq()
+
+    response = client.post('/sale', data={'product_id': product_id, 'quantity': 1, 'unit_price': unit_price})
+    assert response.status_code == 400
+    with app.app_context():
+        assert Sale.query.count() == 0
+        assert db.session.get(Product, product_id).quantity == 10
+        assert get_totals_and_seq()[0] == totals
+
+
+def test_free_items_can_be_sold(app, client):
+    with app.app_context():
+        product = Product(name='Item', quantity=10, price=10, cost_price=6)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    response = client.post('/sale', data={'product_id': product_id, 'quantity': 1, 'unit_price': '0'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert Sale.query.one().total_price == 0
@@ -0,0 +1,41 @@
+"""Bad uploads are reported to the user, never turned into a 500."""
+import io
+import zipfile
+
+import pytest
+
+from models import Product
+
+
+def upload(client, data, filename):
+    return client.post('/products/import', data={'file': (io.BytesIO(data), filename)},
+                       content_type='multipart/form-data')
+
+
+@pytest.mark.parametrize('value', ['inf', '-inf', 'nan', '1e400'])
+def test_non_finite_numbers_are_row_errors(app, client, value):
+    csv = f"name,quantity,price,cost price\nGood,5,2.50,1\nBad,{value},{value},1\n".encode()
+    response = upload(client, csv, 'products.csv')
+    assert response.status_code == 200
+    assert f"Invalid quantity &#39;{value}&#39;" in response.get_data(as_text=True)
+    with app.app_context():
+        assert [p.name for p in Product.query.all()] == ['Good']
+
+
+def not_a_zip():
+    return b'this is not a workbook'
+
+
+def zip_without_workbook():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('hello.txt', 'hi')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('make_file', [not_a_zip, zip_without_workbook])
+def test_malformed_workbook_is_a_validation_error(client, make_file):
+    response = upload(client, make_file(), 'products.xlsx')
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session['_flashes'][-1] == ('danger', 'The file is not a readable .xlsx workbook')
@@ -0,0 +1,108 @@
+"""Export job ownership, leases and the per-user limit."""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from jobs import JobLimitReached, job_runner, process_owner
+from models import db, ExportJob, User
+
+
+def admin_id(app):
+    with app.app_context():
+        return User.query.filter_by(username='admin').one().id
+
+
+def add_job(app, owner, heartbeat_at, status='running'):
+    with app.app_context():
+        job = ExportJob(id=f'job-{owner}', user_id=admin_id(app), kind='products', status=status,
+                        owner=owner, heartbeat_at=heartbeat_at)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def wait_for(app, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = db.session.get(ExportJob, job_id)
+            if job.status not in ('queued', 'running'):
+                return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_only_expired_leases_are_failed(app):
+    app.config['EXPORT_JOB_MAX_ACTIVE_PER_USER'] = 10
+    live = add_job(app, 'other-host:1:live', datetime.utcnow())
+    orphaned = add_job(app, 'other-host:2:dead', datetime.utcnow() - timedelta(hours=1))
+
+    with app.app_context():
+        job_id = job_runner.submit(admin_id(app), 'products', {}).id
+    assert wait_for(app, job_id).status == 'done'
+
+    with app.app_context():
+        assert db.session.get(ExportJob, live).status == 'running'
+        orphan = db.session.get(ExportJob, orphaned)
+        assert orphan.status == 'failed' and orphan.error.startswith('Interrupted')
+
+
+def test_finished_job_is_done_without_error(app):
+    with app.app_context():
+        job_id = job_runner.submit(admin_id(app), 'products', {}).id
+    job = wait_for(app, job_id)
+    assert (job.status, job.error, job.owner) == ('done', None, process_owner())
+
+
+def test_concurrent_submits_respect_the_limit(app):
+    app.config['EXPORT_JOB_MAX_ACTIVE_PER_USER'] = 2
+    user_id = admin_id(app)
+    outcomes = []
+    barrier = threading.Barrier(8)
+
+    def submit():
+        with app.app_context():
+            barrier.wait()
+            try:
+                job_runner.submit(user_id, 'pnl', {})
+                outcomes.append('queued')
+            except JobLimitReached:
+                outcomes.append('refused')
+
+    # Hold the pool's threads so submitted jobs stay active while the others race
+    with app.app_context():
+        executor = job_runner._state()['executor']
+    gate = threading.Event()
+    blockers = [executor.submit(gate.wait) for _ in range(app.config['EXPORT_JOB_WORKERS'])]
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gate.set()
+    for blocker in blockers:
+        blocker.result()
+
+    assert sorted(outcomes) == ['queued'] * 2 + ['refused'] * 6
+
+
+def test_heartbeat_renews_queued_jobs(app):
+    app.config['EXPORT_JOB_LEASE_SECONDS'] = 0.2
+    with app.app_context():
+        executor = job_runner._state()['executor']
+    gate = threading.Event()
+    blockers = [executor.submit(gate.wait) for _ in range(app.config['EXPORT_JOB_WORKERS'])]
+    try:
+        with app.app_context():
+            job = job_runner.submit(admin_id(app), 'products', {})
+            job_id, first = job.id, job.heartbeat_at
+        time.sleep(0.5)
+        with app.app_context():
+            waiting = db.session.get(ExportJob, job_id)
+            assert waiting.status == 'queued'
+            assert waiting.heartbeat_at > first
+    finally:
+        gate.set()
+        for blocker in blockers:
+            blocker.result()
+    assert wait_for(app, job_id).status == 'done'
@@ -0,0 +1,102 @@
+"""Live dashboard events share one sequence across workers and agree with the rendered totals."""
+import re
+
+from app import create_app
+from live_updates import get_broker
+from models import db, LiveEvent, Product
+from totals import get_totals_and_seq
+
+
+def add_product(app):
+    with app.app_context():
+        product = Product(name='Item', quantity=100, price=10, cost_price=6)
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+
+def sell(client, product_id):
+    response = client.post('/sale', data={'product_id': product_id, 'quantity': 1, 'unit_price': 10})
+    assert response.status_code == 302
+
+
+def second_worker(app):
+    """Another app on the same database, standing in for a second server process."""
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+        'LIVE_POLL_SECONDS': 0.05,
+    })
+
+
+def test_totals_and_seq_include_the_same_writes(app, client):
+    product_id = add_product(app)
+    with app.app_context():
+        before, seq = get_totals_and_seq()
+
+    sell(client, product_id)
+    with app.app_context():
+        after, new_seq = get_totals_and_seq()
+        event = db.session.get(LiveEvent, new_seq)
+    assert new_seq == seq + 1
+    assert after['total_sales'] == before['total_sales'] + 10
+    assert '"total_sales": 10' in event.data
+
+    page = client.get('/dashboard').get_data(as_text=True)
+    assert re.search(rf'after={new_seq}\b', page)
+
+
+def test_events_reach_streams_in_other_workers(app, client):
+    product_id = add_product(app)
+    other = second_worker(app)
+    with other.app_context():
+        broker = get_broker()
+        subscription, replay = broker.subscribe(None)
+    try:
+        assert replay == []
+        sell(client, product_id)
+        seq, data = subscription.queue.get(timeout=5)
+        assert data['kind'] == 'sale'
+        assert data['totals']['total_sales'] == 10
+        with app.app_context():
+            assert get_totals_and_seq()[1] == seq
+    finally:
+        broker.unsubscribe(subscription)
+        with other.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def test_replay_resumes_after_the_rendered_seq(app, client):
+    product_id = add_product(app)
+    with app.app_context():
+        _, seq = get_totals_and_seq()
+    sell(client, product_id)
+    sell(client, product_id)
+
+    with app.app_context():
+        broker = get_broker()
+        subscription, replay = broker.subscribe(seq)
+        broker.unsubscribe(subscription)
+        assert [event_seq for event_seq, _ in replay] == [seq + 1, seq + 2]
+
+        # A seq this database never issued (e.g. from before a restore) cannot be patched up
+        subscription, replay = broker.subscribe(seq + 10)
+        broker.unsubscribe(subscription)
+        assert replay is None
+
+        db.session.execute(LiveEvent.__table__.delete().where(LiveEvent.id == seq + 1))
+        db.session.commit()
+        subscription, replay = broker.subscribe(seq)
+        broker.unsubscribe(subscription)
+        assert replay is None
+
+
+def test_rolled_back_writes_publish_nothing(app, client):
+    product_id = add_product(app)
+    with app.app_context():
+        _, seq = get_totals_and_seq()
+    response = client.post('/sale', data={'product_id': product_id, 'quantity': 1000, 'unit_price': 10})
+    assert response.status_code == 400
+    with app.app_context():
+        assert get_totals_and_seq()[1] == seq
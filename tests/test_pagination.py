@@ -0,0 +1,44 @@
+"""Keyset cursors: tampered input must fall back or be rejected, never error."""
+import re
+
+import pytest
+from sqlalchemy import text
+
+from models import db, Product, Sale
+
+# [1,2], [null,1], ["x",1], {}
+BAD_CURSORS = ['WzEsMl0', 'W251bGwsIDFd', 'WyJ4IiwgMV0', 'e30']
+
+
+@pytest.mark.parametrize('cursor', BAD_CURSORS)
+def test_tampered_cursor_restarts_listing(client, cursor):
+    assert client.get(f'/sales?after={cursor}').status_code == 200
+    assert client.get(f'/sales?before={cursor}').status_code == 200
+
+
+@pytest.mark.parametrize('cursor', BAD_CURSORS)
+def test_tampered_cursor_is_rejected_by_api(client, cursor):
+    assert client.get(f'/api/v1/sales?cursor={cursor}').status_code == 400
+
+
+def test_sales_without_timestamp_are_paged(app, client):
+    with app.app_context():
+        product = Product(name='Item', quantity=10, price=1, cost_price=1)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add_all([
+            Sale(product_id=product.id, quantity=1, cost_price=1, unit_price=1, total_price=1) for _ in range(7)
+        ])
+        db.session.flush()
+        db.session.execute(text("UPDATE sale SET timestamp = NULL WHERE id IN (2, 5, 6)"))
+        db.session.commit()
+
+    seen, url = [], '/sales?per_page=2'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += [int(i) for i in re.findall(r'/receipt/(\d+)', html)]
+        next_cursor = re.search(r'after=([\w-]+)', html)
+        url = f'/sales?per_page=2&after={next_cursor.group(1)}' if next_cursor else None
+
+    # Newest first, then the undated sales
+    assert seen == [7, 4, 3, 1, 6, 5, 2]
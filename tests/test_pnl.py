@@ -0,0 +1,34 @@
+"""The P&L keeps products apart by id, not by name."""
+from datetime import datetime
+
+from models import db, Product, Sale
+from pnl import build_pnl
+
+
+def test_products_sharing_a_name_get_separate_lines(app):
+    with app.app_context():
+        first = Product(name='Rice 5kg', quantity=10, price=10, cost_price=6)
+        second = Product(name='Rice 5kg', quantity=10, price=12, cost_price=7)
+        db.session.add_all([first, second])
+        db.session.flush()
+        db.session.add_all([
+            Sale(product_id=first.id, quantity=1, cost_price=6, unit_price=10, total_price=10,
+                 timestamp=datetime.utcnow()),
+            Sale(product_id=second.id, quantity=2, cost_price=7, unit_price=12, total_price=24,
+                 timestamp=datetime.utcnow()),
+        ])
+        db.session.commit()
+
+        sheets = build_pnl()
+        by_product = sheets['By product'].reset_index()
+        assert sorted(zip(by_product['product_id'], by_product['product'], by_product['revenue'])) == [
+            (first.id, 'Rice 5kg', 10), (second.id, 'Rice 5kg', 24),
+        ]
+        assert len(sheets['Product x period']) == 2
+        assert sheets['P&L'].loc['Total', 'revenue'] == 34
+
+
+def test_empty_range_builds(app):
+    with app.app_context():
+        sheets = build_pnl()
+        assert sheets['By product'].empty
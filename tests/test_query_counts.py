@@ -0,0 +1,54 @@
+"""Listings, reports and exports must issue the same number of queries however many sales they show."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Product, Sale, User
+from page_cache import page_cache
+from tests.conftest import count_statements
+
+ENDPOINTS = [
+    '/sales',
+    '/export',
+    '/export/sales?format=csv',
+    '/export/sales?format=xlsx',
+    '/test_user',
+]
+
+
+def add_sales(app, count, start=0):
+    """Add `count` sales, each for its own product and by its own cashier, so lazy loads would show."""
+    with app.app_context():
+        now = datetime.utcnow()
+        for i in range(start, start + count):
+            product = Product(name=f'Product {i}', quantity=100, price=10, cost_price=6)
+            cashier = User(username=f'cashier-{i}', full_name=f'Cashier {i}', email=f'cashier{i}@example.com',
+                           password='x', role='staff', is_approved=True)
+            db.session.add_all([product, cashier])
+            db.session.flush()
+            db.session.add(Sale(product_id=product.id, user_id=cashier.id, quantity=1, cost_price=6,
+                                unit_price=10, total_price=10, timestamp=now - timedelta(minutes=i)))
+        db.session.commit()
+
+
+def statements_for(app, client, url):
+    page_cache.clear()  # measure the rendering path, not a cached page
+    with count_statements(app) as statements:
+        response = client.get(url)
+        response.get_data()  # streamed exports query as the body is read
+        response.close()
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', ENDPOINTS)
+def test_query_count_does_not_grow_with_rows(app, client, url):
+    add_sales(app, 3)
+    statements_for(app, client, url)  # warm-up: user cache, table versions
+    few = statements_for(app, client, url)
+
+    add_sales(app, 30, start=3)
+    many = statements_for(app, client, url)
+
+    assert few > 0
+    assert many == few
@@ -0,0 +1,18 @@
+"""Bulk restock lines with unusable numbers are reported, not applied and not a 500."""
+import pytest
+
+from models import db, Product
+
+
+@pytest.mark.parametrize('quantity, price', [('inf', ''), ('1e400', ''), ('nan', ''), ('5', 'inf'), ('5', 'nan')])
+def test_non_finite_numbers_are_line_errors(app, client, quantity, price):
+    with app.app_context():
+        db.session.add(Product(name='Item', quantity=10, price=2, cost_price=1))
+        db.session.commit()
+
+    response = client.post('/restock/bulk', data={'name': ['Item'], 'quantity': [quantity], 'price': [price]})
+    assert response.status_code == 200
+    assert 'Invalid' in response.get_data(as_text=True)
+    with app.app_context():
+        product = Product.query.one()
+        assert (product.quantity, product.price) == (10, 2)
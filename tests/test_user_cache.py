@@ -0,0 +1,51 @@
+"""Role and approval changes reach cached logins without an in-process invalidate()."""
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+from user_cache import user_cache
+
+
+def login_staff(app):
+    with app.app_context():
+        db.session.add(User(username='staff', full_name='Staff', email='staff@example.com',
+                            password=generate_password_hash('pw'), role='user', is_approved=True))
+        db.session.commit()
+    client = app.test_client()
+    assert client.post('/login', data={'username': 'staff', 'password': 'pw'}).status_code == 302
+    return client
+
+
+def change_staff(app, **fields):
+    # As another worker would: straight to the database, this process's cache untouched
+    with app.app_context():
+        user = User.query.filter_by(username='staff').one()
+        for name, value in fields.items():
+            setattr(user, name, value)
+        db.session.commit()
+
+
+def test_revoked_user_is_logged_out_on_next_request(app):
+    client = login_staff(app)
+    assert client.get('/sales').status_code == 200
+    assert user_cache.stats()['size'] >= 1
+
+    change_staff(app, is_approved=False)
+    assert client.get('/sales').status_code == 302
+
+
+def test_role_change_applies_on_next_request(app):
+    client = login_staff(app)
+    assert client.get('/admin/users').status_code == 403
+
+    change_staff(app, role='admin')
+    assert client.get('/admin/users').status_code == 200
+
+
+def test_deleted_user_is_logged_out(app):
+    client = login_staff(app)
+    assert client.get('/sales').status_code == 200
+
+    with app.app_context():
+        db.session.delete(User.query.filter_by(username='staff').one())
+        db.session.commit()
+    assert client.get('/sales').status_code == 302
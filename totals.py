@@ -0,0 +1,87 @@
+from sqlalchemy import func, select, update
+
+from live_updates import latest_seq, queue_totals
+from models import db, Product, Expense, InventoryTotals
+from queries import sales_source
+
+TOTALS_ID = 1
+TOTAL_FIELDS = ('total_sales', 'total_cogs', 'total_expenses', 'total_stock')
+
+# Float sums accumulated incrementally may differ from a fresh SUM in the last digits
+DRIFT_TOLERANCE = 0.005
+
+
+def compute_totals():
+    """Aggregate the totals from the base tables (full scans; used for rebuilds only)."""
+    sale = sales_source()
+    return {
+        'total_sales': db.session.query(func.sum(sale.c.total_price)).scalar() or 0,
+        'total_cogs': db.session.query(func.sum(sale.c.cost_price * sale.c.quantity)).scalar() or 0,
+        'total_expenses': db.session.query(func.sum(Expense.amount)).scalar() or 0,
+        'total_stock': db.session.query(func.sum(Product.quantity)).scalar() or 0,
+    }
+
+
+def adjust_totals(sales=0, cogs=0, expenses=0, stock=0):
+    """Add deltas to the running totals as part of the current transaction.
+
+    Call this next to the write that changes the underlying rows, before the
+    commit. The UPDATE is relative (`col = col + delta`), so concurrent writers
+    never overwrite each other's changes. The same deltas are pushed to open
+    dashboards once the transaction commits.
+    """
+    if not (sales or cogs or expenses or stock):
+        return
+
+    queue_totals(db.session, total_sales=sales, total_cogs=cogs, total_expenses=expenses, total_stock=stock)
+    db.session.flush()
+    result = db.session.execute(
+        update(InventoryTotals)
+        .where(InventoryTotals.id == TOTALS_ID)
+        .values(
+            total_sales=InventoryTotals.total_sales + sales,
+            total_cogs=InventoryTotals.total_cogs + cogs,
+            total_expenses=InventoryTotals.total_expenses + expenses,
+            total_stock=InventoryTotals.total_stock + stock,
+        )
+    )
+    if result.rowcount == 0:
+        # First write ever: seed the row from the tables, which already include
+        # the change just flushed, so the delta must not be applied again.
+        db.session.add(InventoryTotals(id=TOTALS_ID, **compute_totals()))
+
+
+def get_totals_and_seq():
+    """Return (running totals as a dict, seq of the last live event they include).
+
+    Both are read in one statement, so they come from the same snapshot and
+    a dashboard streaming events after that seq counts every write once.
+    The totals row is seeded if it is missing.
+    """
+    query = select(*[getattr(InventoryTotals, field) for field in TOTAL_FIELDS], latest_seq()).where(
+        InventoryTotals.id == TOTALS_ID
+    )
+    row = db.session.execute(query).first()
+    if row is None:
+        db.session.add(InventoryTotals(id=TOTALS_ID, **compute_totals()))
+        db.session.commit()
+        row = db.session.execute(query).first()
+    return dict(zip(TOTAL_FIELDS, row)), row[-1]
+
+
+def reconcile_totals():
+    """Rebuild the totals from scratch and return {field: (stored, actual)} for any drift."""
+    actual = compute_totals()
+    totals = db.session.get(InventoryTotals, TOTALS_ID)
+    if totals is None:
+        totals = InventoryTotals(id=TOTALS_ID)
+        db.session.add(totals)
+
+    drift = {}
+    for field in TOTAL_FIELDS:
+        stored = getattr(totals, field) or 0
+        if abs(stored - actual[field]) > DRIFT_TOLERANCE:
+            drift[field] = (stored, actual[field])
+        setattr(totals, field, actual[field])
+    db.session.commit()
+    return drift
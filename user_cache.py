@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+
+from models import db, User
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60  # seconds
+
+
+class CachedUser(UserMixin):
+    """Detached snapshot of the identity and role fields the request handlers use."""
+
+    def __init__(self, id, username, full_name, email, role, is_approved, auth_version):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.email = email
+        self.role = role
+        self.is_approved = is_approved
+        self.auth_version = auth_version
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_approver(self):
+        return self.role == 'approver'
+
+
+class UserCache:
+    """Thread-safe LRU cache of CachedUser entries that expire after `ttl` seconds.
+
+    Entries are only trusted after load_cached_user has checked their
+    auth_version, so the TTL just bounds how stale the display fields
+    (name, email) can get; invalidate() drops an entry in this process
+    without waiting for that check to miss.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
+
+
+user_cache = UserCache()
+
+
+def load_cached_user(user_id):
+    """Flask-Login user loader backed by user_cache.
+
+    A cached user costs one primary-key lookup of User.auth_version per
+    request: a role or approval change made by any worker bumps it, so the
+    change applies on the user's next request everywhere. Unapproved users
+    are treated as logged out, so revoking approval (or deleting the user)
+    cuts off their session at once.
+    """
+    user = user_cache.get(user_id)
+    if user is not None:
+        current = db.session.query(User.auth_version).filter(User.id == user_id).scalar()
+        if current != user.auth_version:
+            user_cache.invalidate(user_id)
+            user = None
+    if user is None:
+        row = (
+            db.session.query(
+                User.id, User.username, User.full_name, User.email, User.role, User.is_approved, User.auth_version,
+            )
+            .filter(User.id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        user_cache.put(user)
+    return user if user.is_approved else None
+
+
+@event.listens_for(User, 'before_update')
+def _bump_auth_version(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role.history.has_changes() or state.attrs.is_approved.history.has_changes():
+        # Incremented in SQL so concurrent changes from two workers both count
+        target.auth_version = User.auth_version + 1
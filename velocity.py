@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, DailySalesRollup, Product, SalesVelocity, SalesVelocityState
+
+STATE_ID = 1
+
+# SalesVelocity column -> trailing window in days
+VELOCITY_WINDOWS = {'units_7d': 7, 'units_30d': 30}
+
+# The daily rate is the mean of units_7d / 7 and units_30d / 30, i.e.
+# (30 * units_7d + 7 * units_30d) / RATE_DAYS
+RATE_DAYS = 420
+
+DEFAULT_REORDER_LEAD_DAYS = 7
+DEFAULT_REORDER_COVER_DAYS = 30
+
+FORECAST_COLUMNS = ['id', 'quantity', 'cost_price', 'units_7d', 'units_30d']
+
+
+def last_complete_day():
+    # Rollup days are UTC dates, like the sale timestamps they come from
+    return datetime.utcnow().date() - timedelta(days=1)
+
+
+def _window_delta(old, through, days):
+    """(rollup day filter, per-row units delta) that slides one window from `old` to `through`.
+
+    Days entering the window count up and days leaving it count down; with
+    no `old` the window is being built from scratch. Either way only the
+    rollup rows at the two edges are read, however long the gap.
+    """
+    day, units = DailySalesRollup.day, DailySalesRollup.units
+    span = timedelta(days=days)
+    entering = and_(day > (max(old, through - span) if old else through - span), day <= through)
+    if old is None:
+        return entering, case((entering, units), else_=0)
+    leaving = and_(day > old - span, day <= min(old, through - span))
+    return or_(entering, leaving), case((entering, units), (leaving, -units), else_=0)
+
+
+def refresh_velocity(through=None, full=False):
+    """Bring SalesVelocity up to `through` (default: yesterday) and commit.
+
+    Normally only the days added since the last refresh, and the days that
+    drop out of each window, are read from the rollups and applied as
+    deltas. `full` rebuilds from the last 30 days instead, e.g. after
+    backfill-rollups rewrote history. Returns False if the index was already
+    current (or another process refreshed it first), True otherwise.
+    """
+    through = through or last_complete_day()
+    state = db.session.get(SalesVelocityState, STATE_ID)
+    old = state.through if state and not full else None
+    if old is not None and old >= through:
+        return False
+
+    # Claim the refresh before applying anything: the conditional write takes
+    # SQLite's write lock, and a concurrent refresh that got there first makes
+    # it match nothing, so deltas are never applied twice.
+    if state is None:
+        db.session.add(SalesVelocityState(id=STATE_ID, through=through))
+        db.session.flush()
+    else:
+        claimed = db.session.execute(
+            update(SalesVelocityState)
+            .where(SalesVelocityState.id == STATE_ID, SalesVelocityState.through == state.through)
+            .values(through=through)
+        )
+        if claimed.rowcount == 0:
+            db.session.rollback()
+            return False
+    if old is None:
+        db.session.execute(delete(SalesVelocity))
+
+    filters, deltas = [], {}
+    for column, days in VELOCITY_WINDOWS.items():
+        window_filter, delta = _window_delta(old, through, days)
+        filters.append(window_filter)
+        deltas[column] = func.sum(delta)
+
+    stmt = sqlite_insert(SalesVelocity).from_select(
+        ['product_id', *deltas],
+        select(DailySalesRollup.product_id, *deltas.values())
+        .where(or_(*filters))
+        .group_by(DailySalesRollup.product_id),
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[SalesVelocity.product_id],
+        set_={column: getattr(SalesVelocity, column) + stmt.excluded[column] for column in deltas},
+    ))
+    db.session.commit()
+    return True
+
+
+def _demand():
+    return 30 * SalesVelocity.units_7d + 7 * SalesVelocity.units_30d
+
+
+def _forecast_query(lead_days, due_only, *extra_columns):
+    query = (
+        select(
+            SalesVelocity.product_id, Product.quantity, Product.cost_price,
+            SalesVelocity.units_7d, SalesVelocity.units_30d, *extra_columns,
+        )
+        .join(Product, Product.id == SalesVelocity.product_id)
+        .where(SalesVelocity.units_30d > 0)
+    )
+    if due_only:
+        # quantity <= ceil(demand * lead_days / RATE_DAYS), kept in integers
+        query = query.where((Product.quantity - 1) * RATE_DAYS < _demand() * lead_days)
+    return query
+
+
+def _reorder_days(config, lead_days=None, cover_days=None):
+    return (
+        lead_days or config.get('REORDER_LEAD_DAYS', DEFAULT_REORDER_LEAD_DAYS),
+        cover_days or config.get('REORDER_COVER_DAYS', DEFAULT_REORDER_COVER_DAYS),
+    )
+
+
+def reorder_forecast(lead_days=DEFAULT_REORDER_LEAD_DAYS, cover_days=DEFAULT_REORDER_COVER_DAYS, due_only=False):
+    """Days of cover and reorder suggestions for every selling product, as a DataFrame sorted by cover.
+
+    The daily rate blends the 7-day window (quick to follow a trend) with the
+    30-day one (steadier). A product needs reordering once its stock would
+    not last the supplier lead time; the suggested order tops it up to
+    `lead_days + cover_days` of sales. Products with no sales in 30 days have
+    no days of cover, can never be flagged and are left out, so the one
+    query reads only the index rows of products that are moving (plus their
+    stock by primary key) and the rest is column arithmetic.
+
+    With `due_only` the reorder test is also applied in SQL, so only the
+    flagged products are turned into Python rows; that is what keeps the
+    dashboard cheap with tens of thousands of active products.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rows = db.session.execute(_forecast_query(lead_days, due_only)).all()
+    frame = pd.DataFrame.from_records(rows, columns=FORECAST_COLUMNS)
+
+    # Units per RATE_DAYS days; integer so the ceilings below match the SQL test exactly
+    demand = 30 * frame['units_7d'] + 7 * frame['units_30d']
+    rate = demand / RATE_DAYS
+    frame['daily_rate'] = rate.round(2)
+    frame['days_of_cover'] = (frame['quantity'].clip(lower=0) / rate).round(1)
+    frame['reorder_point'] = -(-demand * lead_days // RATE_DAYS)
+    frame['needs_reorder'] = frame['quantity'] <= frame['reorder_point']
+    target = -(-demand * (lead_days + cover_days) // RATE_DAYS)
+    frame['suggested_order'] = np.where(
+        frame['needs_reorder'], (target - frame['quantity']).clip(lower=0), 0,
+    )
+    frame['order_cost'] = (frame['suggested_order'] * frame['cost_price']).round(2)
+    return frame.sort_values(['days_of_cover', 'id'], kind='stable')
+
+
+def current_reorder_forecast(lead_days=None, cover_days=None, due_only=False):
+    """reorder_forecast() on a freshly slid index, with REORDER_LEAD_DAYS / REORDER_COVER_DAYS as defaults."""
+    refresh_velocity()
+    return reorder_forecast(*_reorder_days(current_app.config, lead_days, cover_days), due_only)
+
+
+def due_reorders(limit, lead_days=None, cover_days=None):
+    """(products needing reorder, the `limit` with the fewest days of cover as dicts), without pandas.
+
+    For the dashboard, which every user lands on: the reorder test and the
+    ordering run in SQL and the figures for the few rows shown are worked
+    out with the same integer arithmetic as reorder_forecast(), so the
+    pandas import stays with the reorder page and the exports.
+    """
+    refresh_velocity()
+    lead_days, cover_days = _reorder_days(current_app.config, lead_days, cover_days)
+    due = _forecast_query(lead_days, True, Product.name)
+    count = db.session.execute(select(func.count()).select_from(due.subquery())).scalar()
+    cover = case((Product.quantity > 0, Product.quantity), else_=0) * 1.0 / _demand()
+    rows = db.session.execute(due.order_by(cover, SalesVelocity.product_id).limit(limit)).all()
+
+    items = []
+    for row in rows:
+        demand = 30 * row.units_7d + 7 * row.units_30d
+        target = -(-demand * (lead_days + cover_days) // RATE_DAYS)
+        suggested = max(target - row.quantity, 0)
+        items.append({
+            'id': row.product_id,
+            'name': row.name,
+            'quantity': row.quantity,
+            'daily_rate': round(demand / RATE_DAYS, 2),
+            'days_of_cover': round(max(row.quantity, 0) * RATE_DAYS / demand, 1),
+            'suggested_order': suggested,
+            'order_cost': round(suggested * row.cost_price, 2),
+        })
+    return count, items
+
+
+def reorder_summary(frame, limit=None, due_only=True):
+    """(products needing reorder, their total order cost, the first `limit` rows as dicts).
+
+    The rows are the flagged products, or with `due_only=False` every product
+    in `frame`. Names are only looked up for the rows returned.
+    """
+    due = frame[frame['needs_reorder']]
+    listed = due if due_only else frame
+    items = (listed if limit is None else listed.head(limit)).to_dict('records')
+    names = dict(db.session.query(Product.id, Product.name).filter(Product.id.in_([item['id'] for item in items])))
+    for item in items:
+        item['name'] = names.get(item['id'])
+    return len(due), float(due['order_cost'].sum()), items